@@ -13,4 +13,17 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'BeachResortReservation.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up, the stream needs the app registry
+from beachreservation.events import availability_stream  # noqa: E402
+
+AVAILABILITY_STREAM_PATH = '/api/v1/beachreservation/freeumbrella/stream'
+
+
+async def application(scope, receive, send):
+    # The availability stream is long lived, it is served outside of Django's request/response cycle
+    if scope['type'] == 'http' and scope['path'] == AVAILABILITY_STREAM_PATH:
+        await availability_stream(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -0,0 +1,144 @@
+"""Precomputed API schema and documentation.
+
+Introspecting every view and serializer on each request is expensive, so the schema, the documentation page and its
+schema.js are rendered once, gzipped and stored in ``settings.API_SCHEMA_ARTIFACTS_DIR`` by the ``build_api_schema``
+management command. The views below only serve those bytes with an ETag and long caching headers. When the artifacts
+haven't been built they are rendered on the first request and kept in memory for the life of the worker.
+
+The schema generation machinery is imported by ``build_schema_artifacts`` only, never when the URLconf is loaded.
+"""
+import gzip
+import hashlib
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.urls import include, path
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.encoding import force_bytes
+from django.utils.http import parse_etags
+from rest_framework.views import APIView
+
+API_TITLE = "Beach Resort Reservation"
+API_DESCRIPTION = "A Web API for managing beach resort reservation"
+
+SCHEMA = 'schema'
+DOCS = 'docs'
+SCHEMA_JS = 'schema-js'
+
+ARTIFACTS = {
+    SCHEMA: ('schema.json.gz', 'application/coreapi+json'),
+    DOCS: ('docs.html.gz', 'text/html; charset=utf-8'),
+    SCHEMA_JS: ('schema.js.gz', 'application/javascript; charset=utf-8'),
+}
+
+CACHE_MAX_AGE = 24 * 60 * 60
+
+
+def build_schema_artifacts():
+    """Render the schema, the documentation page and schema.js, returns their uncompressed bytes by name."""
+    from django.contrib.auth import get_user_model
+    from django.test import RequestFactory
+    from rest_framework.renderers import CoreJSONRenderer, DocumentationRenderer, SchemaJSRenderer
+    from rest_framework.request import Request
+    from rest_framework.schemas import SchemaGenerator
+
+    generator = SchemaGenerator(title=API_TITLE, description=API_DESCRIPTION)
+    schema = generator.get_schema(request=None, public=True)
+
+    request = Request(RequestFactory().get('/docs/'))
+    # The documentation is only served to logged in users, let the page default to session authentication
+    request.user = get_user_model()()
+    renderer_context = {'request': request}
+    return {
+        SCHEMA: force_bytes(CoreJSONRenderer().render(schema, renderer_context=renderer_context)),
+        DOCS: force_bytes(DocumentationRenderer().render(schema, renderer_context=renderer_context)),
+        SCHEMA_JS: force_bytes(SchemaJSRenderer().render(schema, renderer_context=renderer_context)),
+    }
+
+
+def compress(content):
+    # mtime=0 keeps the artifacts byte for byte reproducible between builds
+    return gzip.compress(content, compresslevel=9, mtime=0)
+
+
+def write_schema_artifacts(directory=None):
+    directory = directory or settings.API_SCHEMA_ARTIFACTS_DIR
+    directory.mkdir(parents=True, exist_ok=True)
+    written = []
+    for name, content in build_schema_artifacts().items():
+        artifact = directory / ARTIFACTS[name][0]
+        artifact.write_bytes(compress(content))
+        written.append(artifact)
+    return written
+
+
+class SchemaArtifact:
+    __slots__ = ('compressed', 'content', 'etag', 'gzip_etag')
+
+    def __init__(self, compressed):
+        self.compressed = compressed
+        self.content = gzip.decompress(compressed)
+        digest = hashlib.sha256(self.content).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gzip"'
+
+
+_artifacts = {}
+_artifacts_lock = threading.Lock()
+
+
+def get_schema_artifact(name):
+    artifact = _artifacts.get(name)
+    if artifact is not None:
+        return artifact
+    with _artifacts_lock:
+        if not _artifacts:
+            directory = settings.API_SCHEMA_ARTIFACTS_DIR
+            if all((directory / file_name).exists() for file_name, _ in ARTIFACTS.values()):
+                loaded = {n: (directory / file_name).read_bytes() for n, (file_name, _) in ARTIFACTS.items()}
+            else:
+                loaded = {n: compress(content) for n, content in build_schema_artifacts().items()}
+            _artifacts.update({n: SchemaArtifact(compressed) for n, compressed in loaded.items()})
+    return _artifacts[name]
+
+
+def reset_schema_artifacts():
+    with _artifacts_lock:
+        _artifacts.clear()
+
+
+class PrecomputedSchemaView(APIView):
+    artifact = None
+    # The schema views aren't part of the schema
+    schema = None
+
+    def get(self, request):
+        artifact = get_schema_artifact(self.artifact)
+        gzipped = 'gzip' in request.headers.get('Accept-Encoding', '')
+        # Each encoding is a different representation with its own strong ETag, either one validates the cache
+        etag = artifact.gzip_etag if gzipped else artifact.etag
+        if {artifact.etag, artifact.gzip_etag} & set(parse_etags(request.headers.get('If-None-Match', ''))):
+            response = HttpResponseNotModified()
+        elif gzipped:
+            response = HttpResponse(artifact.compressed, content_type=ARTIFACTS[self.artifact][1])
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(artifact.content, content_type=ARTIFACTS[self.artifact][1])
+        response['ETag'] = etag
+        # Private: the documentation is only served to authorised users
+        patch_cache_control(response, private=True, max_age=CACHE_MAX_AGE)
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+def include_precomputed_docs_urls():
+    urls = [
+        path('', PrecomputedSchemaView.as_view(artifact=DOCS), name='docs-index'),
+        path('schema.js', PrecomputedSchemaView.as_view(artifact=SCHEMA_JS), name='schema-js'),
+    ]
+    return include((urls, 'api-docs'), namespace='api-docs')
+
+
+def get_precomputed_schema_view():
+    return PrecomputedSchemaView.as_view(artifact=SCHEMA)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,6 +43,7 @@ INSTALLED_APPS = [
     'rest_framework.authtoken',
     'allauth',
     'allauth.account',
+    'allauth.socialaccount',
     'dj_rest_auth',
     'dj_rest_auth.registration',
     'beachreservation.apps.BeachreservationConfig',
@@ -57,6 +59,8 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'rest_framework.schemas.coreapi.AutoSchema',
 }
 MIDDLEWARE = [
+    # First, so that the profiles of the beach managers' requests cover the whole middleware chain
+    'beachreservation.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -103,10 +107,28 @@ WSGI_APPLICATION = 'BeachResortReservation.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        # Overridable so that tools such as the load generator can run the project against a scratch database
+        'NAME': os.environ.get('BEACHRESORT_DATABASE_NAME', BASE_DIR / 'db.sqlite3'),
+    },
+    # Read replica of the default database, only used when BEACHRESERVATION_READ_REPLICA points to it
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('BEACHRESORT_REPLICA_DATABASE_NAME', BASE_DIR / 'db.replica.sqlite3'),
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.replica.sqlite3',
+        },
+    },
 }
 
+DATABASE_ROUTERS = ['beachreservation.routers.PrimaryReplicaRouter']
+
+# Database alias serving the reads of the beachreservation views, None reads everything from the primary
+BEACHRESERVATION_READ_REPLICA = os.environ.get('BEACHRESORT_READ_REPLICA') or None
+# How long a user reads from the primary after one of their own writes
+BEACHRESERVATION_READ_YOUR_WRITES_SECONDS = 5
+# How long an umbrella stays held for a customer who is checking out
+BEACHRESERVATION_HOLD_SECONDS = 5 * 60
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -141,6 +163,15 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Gzipped API schema and documentation, built by `python manage.py build_api_schema`
+API_SCHEMA_ARTIFACTS_DIR = BASE_DIR / 'build' / 'api-schema'
+
+# On-demand request profiles of the beach managers (see beachreservation.profiling)
+BEACHRESERVATION_PROFILES_DIR = BASE_DIR / 'build' / 'profiles'
+# Per process unless the default cache is a shared backend
+BEACHRESERVATION_PROFILES_PER_MINUTE = 10
+BEACHRESERVATION_PROFILES_KEPT = 50
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
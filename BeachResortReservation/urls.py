@@ -15,17 +15,14 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from rest_framework.documentation import include_docs_urls
-from rest_framework.schemas import get_schema_view
 
-API_TITLE = "Beach Resort Reservation"
-API_DESCRIPTION = "A Web API for managing beach resort reservation"
+from BeachResortReservation.schema import include_precomputed_docs_urls, get_precomputed_schema_view
 
 urlpatterns = [
     path('admin-OaTurfilowsP/', admin.site.urls),
     path('auth/', include('rest_framework.urls')),
-    path('docs/', include_docs_urls(title=API_TITLE, description=API_DESCRIPTION)),
-    path('schema/', get_schema_view(title=API_TITLE)),
+    path('docs/', include_precomputed_docs_urls()),
+    path('schema/', get_precomputed_schema_view()),
     path('api/v1/beachreservation/', include('beachreservation.urls')),
     path('api/v1/auth/', include('dj_rest_auth.urls')),
     path('api/v1/auth/registration/', include('dj_rest_auth.registration.urls')),
@@ -1,5 +1,97 @@
 from django.contrib import admin
-from beachreservation.models import UmbrellaReservation
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
 
-admin.site.register(UmbrellaReservation)
-# Register your models here.
+from beachreservation import utils
+from beachreservation.models import UmbrellaReservation, RecurringUmbrellaReservation
+
+# Below this many rows an exact COUNT(*) is cheap enough and always preferred
+ESTIMATED_COUNT_THRESHOLD = 10000
+
+
+def estimated_row_count(model, using):
+    """Row count estimate kept by the database statistics, None if the backend doesn't provide one."""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [table])
+        elif connection.vendor == 'mysql':
+            cursor.execute("SELECT table_rows FROM information_schema.tables "
+                           "WHERE table_schema = DATABASE() AND table_name = %s", [table])
+        elif connection.vendor == 'sqlite':
+            # sqlite_stat1 only exists once ANALYZE has been run
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table])
+            row = cursor.fetchone()
+            return int(row[0].split()[0]) if row is not None else None
+        else:
+            return None
+        row = cursor.fetchone()
+    return int(row[0]) if row is not None and row[0] is not None and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator using the table statistics instead of a COUNT(*) when the changelist isn't filtered."""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class UmbrellaListFilter(admin.SimpleListFilter):
+    title = 'umbrella'
+    parameter_name = 'umbrella'
+
+    def lookups(self, request, model_admin):
+        # The umbrellas are known in advance, no need for a SELECT DISTINCT over the whole table
+        return [(str(i), str(i)) for i in range(utils.MIN_UMBRELLA_ID, utils.MAX_UMBRELLA_ID + 1)]
+
+    def queryset(self, request, queryset):
+        if self.value() is not None:
+            return queryset.filter(reserved_umbrella_id=self.value())
+        return queryset
+
+
+class ReservationModelAdmin(admin.ModelAdmin):
+    list_select_related = ('customer',)
+    list_filter = (UmbrellaListFilter,)
+    raw_id_fields = ('customer',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    search_fields = ('customer__username',)
+    search_help_text = "Exact customer username, reservation id or umbrella id"
+
+    def get_search_results(self, request, queryset, search_term):
+        # Only exact lookups on indexed columns, never a LIKE '%term%' over the whole table
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        if search_term.isdigit():
+            return queryset.filter(Q(pk=search_term) | Q(reserved_umbrella_id=search_term)), False
+        return queryset.filter(customer__username=search_term), False
+
+
+@admin.register(UmbrellaReservation)
+class UmbrellaReservationAdmin(ReservationModelAdmin):
+    list_display = ('id', 'customer', 'reserved_umbrella_id', 'number_of_seats', 'reservation_start_date',
+                    'reservation_end_date', 'reservation_price')
+    date_hierarchy = 'reservation_start_date'
+    ordering = ('-reservation_start_date',)
+
+
+@admin.register(RecurringUmbrellaReservation)
+class RecurringUmbrellaReservationAdmin(ReservationModelAdmin):
+    list_display = ('id', 'customer', 'reserved_umbrella_id', 'number_of_seats', 'recurrence_start_date',
+                    'recurrence_end_date', 'weekdays', 'reservation_price')
+    date_hierarchy = 'recurrence_start_date'
+    ordering = ('-recurrence_start_date',)
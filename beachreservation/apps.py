@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class BeachreservationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'beachreservation'
+
+    def ready(self):
+        import beachreservation.signals  # noqa: F401
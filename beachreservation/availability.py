@@ -0,0 +1,113 @@
+import bisect
+from itertools import accumulate
+
+from django.db.models import F, Q
+
+from beachreservation import recurrence
+from beachreservation.models import UmbrellaReservation, RecurringUmbrellaReservation, UmbrellaHold
+
+
+def query_for_umbrella_ids_with_overlapping_reservations(start_date, end_date):
+    criterion1 = Q(reservation_start_date__lte=end_date)
+    criterion2 = Q(reservation_end_date__gte=start_date)
+    return UmbrellaReservation.objects.filter(criterion1 & criterion2).values_list('reserved_umbrella_id', flat=True)
+
+
+def query_for_umbrella_ids_with_overlapping_holds(start_date, end_date):
+    return UmbrellaHold.objects.active().filter(
+        reservation_start_date__lte=end_date, reservation_end_date__gte=start_date).values_list(
+        'reserved_umbrella_id', flat=True)
+
+
+def umbrella_ids_with_overlapping_recurrences(start_date, end_date):
+    # A recurrence is never expanded into its single days. When the range lies inside the recurrence bounds the
+    # weekdays of the range can be tested with a bitwise and directly in the database
+    range_weekdays = recurrence.weekday_mask_for_range(start_date, end_date)
+    occupied = set(RecurringUmbrellaReservation.objects.filter(
+        recurrence_start_date__lte=start_date, recurrence_end_date__gte=end_date).annotate(
+        booked_range_weekdays=F('weekdays').bitand(range_weekdays)).filter(
+        booked_range_weekdays__gt=0).values_list('reserved_umbrella_id', flat=True).distinct())
+
+    # The few recurrences starting or ending inside the range are tested arithmetically on their intersection
+    partially_overlapping = RecurringUmbrellaReservation.objects.filter(
+        Q(recurrence_start_date__gt=start_date) | Q(recurrence_end_date__lt=end_date),
+        recurrence_start_date__lte=end_date, recurrence_end_date__gte=start_date).exclude(
+        reserved_umbrella_id__in=occupied).values_list(
+        'reserved_umbrella_id', 'recurrence_start_date', 'recurrence_end_date', 'weekdays')
+    occupied |= {umbrella_id for umbrella_id, recurrence_start_date, recurrence_end_date, weekdays
+                 in partially_overlapping
+                 if recurrence.recurrence_overlaps_range(recurrence_start_date, recurrence_end_date, weekdays,
+                                                         start_date, end_date)}
+    return occupied
+
+
+def occupied_umbrella_ids(start_date, end_date):
+    occupied = set(query_for_umbrella_ids_with_overlapping_reservations(start_date, end_date).union(
+        query_for_umbrella_ids_with_overlapping_holds(start_date, end_date)))
+    occupied |= umbrella_ids_with_overlapping_recurrences(start_date, end_date)
+    return occupied
+
+
+def _occupied_intervals_by_umbrella(umbrella_ids, start_date, end_date):
+    """Sorted (start, end) intervals of every umbrella, from one query per kind of occupancy for the whole batch."""
+    intervals = {}
+    reservations = UmbrellaReservation.objects.filter(
+        reserved_umbrella_id__in=umbrella_ids, reservation_start_date__lte=end_date,
+        reservation_end_date__gte=start_date).values_list(
+        'reserved_umbrella_id', 'reservation_start_date', 'reservation_end_date')
+    holds = UmbrellaHold.objects.active().filter(
+        reserved_umbrella_id__in=umbrella_ids, reservation_start_date__lte=end_date,
+        reservation_end_date__gte=start_date).values_list(
+        'reserved_umbrella_id', 'reservation_start_date', 'reservation_end_date')
+    # The held umbrellas come along in the same query
+    for umbrella_id, reservation_start_date, reservation_end_date in reservations.union(holds, all=True):
+        intervals.setdefault(umbrella_id, []).append((reservation_start_date, reservation_end_date))
+    for umbrella_id in intervals:
+        intervals[umbrella_id].sort()
+    return intervals
+
+
+def _recurrences_by_umbrella(umbrella_ids, start_date, end_date):
+    recurrences = {}
+    rows = RecurringUmbrellaReservation.objects.filter(
+        reserved_umbrella_id__in=umbrella_ids, recurrence_start_date__lte=end_date,
+        recurrence_end_date__gte=start_date).values_list(
+        'reserved_umbrella_id', 'recurrence_start_date', 'recurrence_end_date', 'weekdays')
+    for umbrella_id, recurrence_start_date, recurrence_end_date, weekdays in rows:
+        recurrences.setdefault(umbrella_id, []).append((recurrence_start_date, recurrence_end_date, weekdays))
+    return recurrences
+
+
+def batch_availability(candidates):
+    """Availability of a batch of (umbrella_id, start_date, end_date) candidates.
+
+    The occupancy of the whole batch is fetched at once, each candidate is then answered with a binary search over
+    the sorted intervals of its umbrella.
+    """
+    if not candidates:
+        return []
+    umbrella_ids = {umbrella_id for umbrella_id, _, _ in candidates}
+    start_date = min(candidate_start_date for _, candidate_start_date, _ in candidates)
+    end_date = max(candidate_end_date for _, _, candidate_end_date in candidates)
+
+    intervals = _occupied_intervals_by_umbrella(umbrella_ids, start_date, end_date)
+    starts = {umbrella_id: [start for start, _ in umbrella_intervals]
+              for umbrella_id, umbrella_intervals in intervals.items()}
+    # Running maximum of the end dates: the intervals starting before a date overlap it iff their max end is after it
+    max_ends = {umbrella_id: list(accumulate((end for _, end in umbrella_intervals), max))
+                for umbrella_id, umbrella_intervals in intervals.items()}
+    recurrences = _recurrences_by_umbrella(umbrella_ids, start_date, end_date)
+
+    availability = []
+    for umbrella_id, candidate_start_date, candidate_end_date in candidates:
+        available = True
+        if umbrella_id in starts:
+            position = bisect.bisect_right(starts[umbrella_id], candidate_end_date)
+            available = position == 0 or max_ends[umbrella_id][position - 1] < candidate_start_date
+        if available:
+            available = not any(
+                recurrence.recurrence_overlaps_range(recurrence_start_date, recurrence_end_date, weekdays,
+                                                     candidate_start_date, candidate_end_date)
+                for recurrence_start_date, recurrence_end_date, weekdays in recurrences.get(umbrella_id, ()))
+        availability.append(available)
+    return availability
@@ -0,0 +1,187 @@
+"""Server-sent events stream of the availability changes.
+
+Clients subscribe to a date range on ``/api/v1/beachreservation/freeumbrella/stream`` and receive a small event
+every time a reservation affecting that range is created or destroyed. The stream is a plain ASGI application
+mounted in ``BeachResortReservation/asgi.py``, so it is only available when the project is served through ASGI.
+
+Every change is published once to the in-process ``availability_broker``, which fans it out to the queues of the
+interested subscribers: no query is ever run per subscriber.
+"""
+import asyncio
+import datetime
+import json
+import threading
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework.authtoken.models import Token
+
+from beachreservation import recurrence
+
+RESERVED = 'reserved'
+RELEASED = 'released'
+
+DEFAULT_KEEPALIVE_SECONDS = 15
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class Subscription:
+    __slots__ = ('start_date', 'end_date', 'loop', 'queue', 'overflowed')
+
+    def __init__(self, start_date, end_date, loop):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def deliver(self, payload):
+        # Slow clients don't get to grow the queue forever, they are told to refresh instead
+        try:
+            self.queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class AvailabilityBroker:
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscriptions)
+
+    def subscribe(self, start_date, end_date):
+        subscription = Subscription(start_date, end_date, asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event_type, umbrella_id, start_date, end_date, weekdays=recurrence.ALL_WEEKDAYS):
+        """Fan out a change to the subscribers whose range contains at least one of the affected days.
+
+        Safe to call from any thread: the payload is handed over to each event loop with a single callback.
+        """
+        with self._lock:
+            subscriptions = [s for s in self._subscriptions
+                             if recurrence.recurrence_overlaps_range(start_date, end_date, weekdays,
+                                                                     s.start_date, s.end_date)]
+        if not subscriptions:
+            return
+
+        data = {'umbrella_id': umbrella_id, 'start_date': start_date.isoformat(), 'end_date': end_date.isoformat()}
+        if weekdays != recurrence.ALL_WEEKDAYS:
+            data['weekdays'] = weekdays
+        payload = f"event: {event_type}\ndata: {json.dumps(data)}\n\n".encode()
+
+        by_loop = {}
+        for subscription in subscriptions:
+            by_loop.setdefault(subscription.loop, []).append(subscription)
+        for loop, loop_subscriptions in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_deliver_all, payload, loop_subscriptions)
+            except RuntimeError:
+                # The loop has been closed, its subscribers are gone
+                pass
+
+
+def _deliver_all(payload, subscriptions):
+    for subscription in subscriptions:
+        subscription.deliver(payload)
+
+
+availability_broker = AvailabilityBroker()
+
+
+def _parse_date_range(query_string):
+    params = parse_qs(query_string.decode('latin-1'))
+    start_date_initial = params.get('start_date', [None])[0]
+    end_date_initial = params.get('end_date', [None])[0]
+    if start_date_initial is None or end_date_initial is None:
+        raise ValueError("Start date and End date parameters are required")
+
+    start_date = datetime.datetime.strptime(start_date_initial, '%Y-%m-%d').date()
+    end_date = datetime.datetime.strptime(end_date_initial, '%Y-%m-%d').date()
+
+    if end_date < start_date:
+        raise ValueError("End date can't be before start date")
+
+    return start_date, end_date
+
+
+@sync_to_async
+def _authenticate(headers):
+    authorization = headers.get(b'authorization', b'').decode('latin-1').split()
+    if len(authorization) != 2 or authorization[0].lower() != 'token':
+        return None
+    token = Token.objects.select_related('user').filter(key=authorization[1]).first()
+    if token is None or not token.user.is_active:
+        return None
+    return token.user
+
+
+async def _send_json(send, status, data):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json')]})
+    await send({'type': 'http.response.body', 'body': json.dumps(data).encode()})
+
+
+async def availability_stream(scope, receive, send):
+    """ASGI application streaming the availability changes of a date range as server-sent events."""
+    if scope['method'] != 'GET':
+        await _send_json(send, 405, {'detail': f"Method \"{scope['method']}\" not allowed."})
+        return
+
+    user = await _authenticate(dict(scope['headers']))
+    if user is None:
+        await _send_json(send, 403, {'detail': "Authentication credentials were not provided."})
+        return
+
+    try:
+        start_date, end_date = _parse_date_range(scope['query_string'])
+    except ValueError as e:
+        await _send_json(send, 400, list(e.args))
+        return
+
+    keepalive = getattr(settings, 'AVAILABILITY_STREAM_KEEPALIVE', DEFAULT_KEEPALIVE_SECONDS)
+    subscription = availability_broker.subscribe(start_date, end_date)
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+    try:
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ]})
+        await send({'type': 'http.response.body', 'body': b": subscribed\n\n", 'more_body': True})
+
+        while not disconnected.done():
+            next_payload = asyncio.ensure_future(subscription.queue.get())
+            await asyncio.wait({next_payload, disconnected}, timeout=keepalive,
+                               return_when=asyncio.FIRST_COMPLETED)
+            if not next_payload.done():
+                next_payload.cancel()
+                if not disconnected.done():
+                    await send({'type': 'http.response.body', 'body': b": keepalive\n\n", 'more_body': True})
+                continue
+
+            body = next_payload.result()
+            if subscription.overflowed:
+                subscription.overflowed = False
+                body += b"event: resync\ndata: {}\n\n"
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+    finally:
+        availability_broker.unsubscribe(subscription)
+        disconnected.cancel()
+
+
+async def _wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
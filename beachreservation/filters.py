@@ -0,0 +1,119 @@
+import datetime
+import math
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend
+
+from beachreservation import utils
+
+# Bounds of the integer columns, larger values can't even be sent to the database
+MIN_DB_INTEGER = -2 ** 63
+MAX_DB_INTEGER = 2 ** 63 - 1
+# Longest range two dates can span, no reservation can be booked for more days
+MAX_BOOKED_DAYS = (datetime.date.max - datetime.date.min).days + 1
+
+
+def parse_date(name, value):
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise serializers.ValidationError({name: "Dates must be in the YYYY-MM-DD format"})
+
+
+def parse_integers(name, value):
+    try:
+        integers = [int(i) for i in value.split(',') if i.strip()]
+    except ValueError:
+        raise serializers.ValidationError({name: "Expected a comma separated list of integers"})
+    if any(i < MIN_DB_INTEGER or i > MAX_DB_INTEGER for i in integers):
+        raise serializers.ValidationError({name: "Integer out of range"})
+    return integers
+
+
+def parse_price(name, value):
+    try:
+        price = Decimal(value)
+    except InvalidOperation:
+        raise serializers.ValidationError({name: "Expected a number"})
+    if not price.is_finite():
+        raise serializers.ValidationError({name: "Expected a number"})
+    return price
+
+
+def price_range_criterion(seats, min_price, max_price):
+    """Translate a price range into ranges of booked days for every seat count.
+
+    The price is a linear function of the booked days for a given number of seats, so the range becomes an OR of
+    (number_of_seats = s AND booked_days BETWEEN a AND b) terms, each one answered by the seats/booked days index.
+    Returns None when no reservation can fall in the range.
+    """
+    base_cost = Decimal(f"{utils.UMBRELLA_BASE_COST}")
+    criterion = None
+    for seat_count in seats:
+        daily_cost = utils.SEAT_COST_PER_DAY * seat_count
+        min_days, max_days = 1, MAX_BOOKED_DAYS
+        # The bounds are clamped before being turned into integers, a huge price would otherwise overflow the
+        # database column
+        if min_price is not None:
+            exact_min_days = (min_price - base_cost) / daily_cost
+            if exact_min_days > MAX_BOOKED_DAYS:
+                continue
+            min_days = max(min_days, math.ceil(max(exact_min_days, 0)))
+        if max_price is not None:
+            exact_max_days = (max_price - base_cost) / daily_cost
+            if exact_max_days < min_days:
+                continue
+            max_days = math.floor(min(exact_max_days, MAX_BOOKED_DAYS))
+        if max_days < min_days:
+            continue
+        term = Q(number_of_seats=seat_count, booked_days__gte=min_days)
+        if max_days < MAX_BOOKED_DAYS:
+            term &= Q(booked_days__lte=max_days)
+        criterion = term if criterion is None else criterion | term
+    return criterion
+
+
+class ReservationSearchFilter(BaseFilterBackend):
+    """Server side search over the reservations, every filter maps onto an indexed column.
+
+    Supported query parameters:
+        start_date, end_date: reservations overlapping the range (either bound can be omitted)
+        umbrella_id: comma separated list of umbrella ids
+        customer: customer id
+        seats: comma separated list of seat counts
+        min_price, max_price: price range, bounds included
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+
+        if params.get('start_date'):
+            queryset = queryset.filter(reservation_end_date__gte=parse_date('start_date', params['start_date']))
+        if params.get('end_date'):
+            queryset = queryset.filter(reservation_start_date__lte=parse_date('end_date', params['end_date']))
+        if params.get('umbrella_id'):
+            umbrella_ids = [i for i in parse_integers('umbrella_id', params['umbrella_id'])
+                            if utils.MIN_UMBRELLA_ID <= i <= utils.MAX_UMBRELLA_ID]
+            queryset = queryset.filter(reserved_umbrella_id__in=umbrella_ids)
+        if params.get('customer'):
+            customer = parse_integers('customer', params['customer'])
+            if len(customer) != 1:
+                raise serializers.ValidationError({'customer': "Expected a single customer id"})
+            queryset = queryset.filter(customer_id=customer[0])
+
+        seats = list(range(utils.MIN_SEAT_UMBRELLA, utils.MAX_SEAT_UMBRELLA + 1))
+        if params.get('seats'):
+            seats = [i for i in parse_integers('seats', params['seats']) if i in seats]
+            queryset = queryset.filter(number_of_seats__in=seats)
+
+        min_price = parse_price('min_price', params['min_price']) if params.get('min_price') else None
+        max_price = parse_price('max_price', params['max_price']) if params.get('max_price') else None
+        if min_price is not None or max_price is not None:
+            criterion = price_range_criterion(seats, min_price, max_price)
+            if criterion is None:
+                return queryset.none()
+            queryset = queryset.filter(criterion)
+
+        return queryset
@@ -0,0 +1,17 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from BeachResortReservation.schema import write_schema_artifacts
+
+
+class Command(BaseCommand):
+    help = "Render the API schema and documentation once and store them gzipped for the schema views"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-dir', type=Path, default=None,
+                            help="Defaults to settings.API_SCHEMA_ARTIFACTS_DIR")
+
+    def handle(self, *args, **options):
+        for artifact in write_schema_artifacts(options['output_dir']):
+            self.stdout.write(f"{artifact} ({artifact.stat().st_size} bytes)")
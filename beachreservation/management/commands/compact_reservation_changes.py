@@ -0,0 +1,34 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from beachreservation.models import ReservationChange
+
+
+class Command(BaseCommand):
+    help = "Delete the reservation change log entries older than the given number of days"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help="keep the changes of the last DAYS days")
+        parser.add_argument('--batch-size', type=int, default=1000, help="rows deleted per statement")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - datetime.timedelta(days=options['days'])
+        bounds = ReservationChange.objects.aggregate(
+            latest_seq=Max('seq'), compactable_seq=Max('seq', filter=Q(created_at__lt=cutoff)))
+        if bounds['compactable_seq'] is None:
+            self.stdout.write("Nothing to compact")
+            return
+
+        # The newest entry is always kept: the clients compare their position against the oldest remaining one
+        last_seq = min(bounds['compactable_seq'], bounds['latest_seq'] - 1)
+        deleted = 0
+        while True:
+            batch = list(ReservationChange.objects.filter(seq__lte=last_seq).order_by('seq').values_list(
+                'seq', flat=True)[:options['batch_size']])
+            if not batch:
+                break
+            deleted += ReservationChange.objects.filter(seq__lte=batch[-1]).delete()[0]
+        self.stdout.write(f"Deleted {deleted} reservation changes")
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from beachreservation.models import UmbrellaHold
+
+
+class Command(BaseCommand):
+    help = "Delete the expired umbrella holds in batches, meant to be run every few minutes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="rows deleted per statement")
+
+    def handle(self, *args, **options):
+        deleted = 0
+        while True:
+            batch = UmbrellaHold.objects.purge_expired(batch_size=options['batch_size'])
+            if not batch:
+                break
+            deleted += batch
+        self.stdout.write(f"Deleted {deleted} expired holds")
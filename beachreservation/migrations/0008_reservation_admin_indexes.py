@@ -0,0 +1,34 @@
+# Generated by Django 4.1.3 on 2026-10-19 13:33
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('beachreservation', '0007_recurringumbrellareservation'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recurringumbrellareservation',
+            name='recurrence_start_date',
+            field=models.DateField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='recurringumbrellareservation',
+            name='reserved_umbrella_id',
+            field=models.PositiveIntegerField(db_index=True, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(50)]),
+        ),
+        migrations.AlterField(
+            model_name='umbrellareservation',
+            name='reservation_start_date',
+            field=models.DateField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='umbrellareservation',
+            name='reserved_umbrella_id',
+            field=models.PositiveIntegerField(db_index=True, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(50)]),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.1.3 on 2026-10-19 13:38
+
+import django.core.validators
+from django.db import migrations, models
+
+
+def fill_booked_days(apps, schema_editor):
+    UmbrellaReservation = apps.get_model('beachreservation', 'UmbrellaReservation')
+    reservations = list(UmbrellaReservation.objects.only('reservation_start_date', 'reservation_end_date'))
+    for reservation in reservations:
+        reservation.booked_days = (reservation.reservation_end_date - reservation.reservation_start_date).days + 1
+    UmbrellaReservation.objects.bulk_update(reservations, ['booked_days'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('beachreservation', '0008_reservation_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='umbrellareservation',
+            name='booked_days',
+            field=models.IntegerField(default=1, editable=False),
+        ),
+        migrations.RunPython(fill_booked_days, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='umbrellareservation',
+            name='reservation_end_date',
+            field=models.DateField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='umbrellareservation',
+            name='reserved_umbrella_id',
+            field=models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(50)]),
+        ),
+        migrations.AddIndex(
+            model_name='umbrellareservation',
+            index=models.Index(fields=['reserved_umbrella_id', 'reservation_start_date'], name='beachreserv_reserve_0bfaf0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='umbrellareservation',
+            index=models.Index(fields=['customer', 'reservation_start_date'], name='beachreserv_custome_06c3b8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='umbrellareservation',
+            index=models.Index(fields=['number_of_seats', 'booked_days'], name='beachreserv_number__9de634_idx'),
+        ),
+    ]
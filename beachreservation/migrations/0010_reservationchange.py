@@ -0,0 +1,34 @@
+# Generated by Django 4.1.3 on 2026-10-19 13:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('beachreservation', '0009_reservation_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservationChange',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('created', 'Created'), ('cancelled', 'Cancelled')], max_length=9)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('reservation_id', models.BigIntegerField()),
+                ('number_of_seats', models.PositiveIntegerField()),
+                ('reservation_start_date', models.DateField()),
+                ('reservation_end_date', models.DateField()),
+                ('reserved_umbrella_id', models.PositiveIntegerField()),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='reservationchange',
+            index=models.Index(fields=['customer', 'seq'], name='beachreserv_custome_6275b5_idx'),
+        ),
+    ]
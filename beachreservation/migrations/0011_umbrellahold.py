@@ -0,0 +1,37 @@
+# Generated by Django 4.1.3 on 2026-10-19 13:45
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('beachreservation', '0010_reservationchange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UmbrellaHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number_of_seats', models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(2), django.core.validators.MaxValueValidator(4)])),
+                ('reservation_start_date', models.DateField()),
+                ('reservation_end_date', models.DateField()),
+                ('reserved_umbrella_id', models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(50)])),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='umbrellahold',
+            index=models.Index(fields=['reserved_umbrella_id', 'reservation_start_date'], name='beachreserv_reserve_f4916b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='umbrellahold',
+            index=models.Index(fields=['customer', 'expires_at'], name='beachreserv_custome_6a47f4_idx'),
+        ),
+    ]
@@ -1,11 +1,13 @@
-import decimal
+import datetime
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
-from decimal import *
+from django.utils import timezone
 import beachreservation.utils as utils
+from beachreservation import recurrence, pricing
 
 
 # Create your models here.
@@ -14,17 +16,26 @@ class UmbrellaReservation(models.Model):
     number_of_seats = models.PositiveIntegerField(
         validators=[MinValueValidator(utils.MIN_SEAT_UMBRELLA), MaxValueValidator(utils.MAX_SEAT_UMBRELLA)])
 
-    reservation_start_date = models.DateField()
-    reservation_end_date = models.DateField()
+    reservation_start_date = models.DateField(db_index=True)
+    reservation_end_date = models.DateField(db_index=True)
+    # Stored so that price ranges can be searched through an index, kept up to date by save(). Writes bypassing save()
+    # (bulk_create, QuerySet.update() of the dates) must set it themselves, to end - start + 1
+    booked_days = models.IntegerField(editable=False, default=1)
 
     reserved_umbrella_id = models.PositiveIntegerField(
         validators=[MinValueValidator(utils.MIN_UMBRELLA_ID), MaxValueValidator(utils.MAX_UMBRELLA_ID)])
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['reserved_umbrella_id', 'reservation_start_date']),
+            models.Index(fields=['customer', 'reservation_start_date']),
+            models.Index(fields=['number_of_seats', 'booked_days']),
+        ]
+
     @property
     def reservation_price(self):
-        decimal.getcontext().prec = 4
-        booked_days = (self.reservation_end_date - self.reservation_start_date).days + 1
-        return Decimal(f"{utils.UMBRELLA_BASE_COST}") + 10 * self.number_of_seats * booked_days
+        return pricing.reservation_price(
+            self.number_of_seats, pricing.booked_days(self.reservation_start_date, self.reservation_end_date))
 
     def validate_end_date_after_start_date(self):
         if self.reservation_start_date > self.reservation_end_date:
@@ -39,11 +50,232 @@ class UmbrellaReservation(models.Model):
                     'reservation_end_date': "We are sorry, this umbrella is already occupied for the selected period",
                     'reservation_start_date': "We are sorry, this umbrella is already occupied for the selected period"
                 })
+        recurring_reservations = RecurringUmbrellaReservation.objects.filter(
+            reserved_umbrella_id=self.reserved_umbrella_id,
+            recurrence_start_date__lte=self.reservation_end_date,
+            recurrence_end_date__gte=self.reservation_start_date)
+        for res in recurring_reservations:
+            if recurrence.recurrence_overlaps_range(res.recurrence_start_date, res.recurrence_end_date, res.weekdays,
+                                                    self.reservation_start_date, self.reservation_end_date):
+                raise ValidationError({
+                    'reservation_end_date': "We are sorry, this umbrella is already occupied for the selected period",
+                    'reservation_start_date': "We are sorry, this umbrella is already occupied for the selected period"
+                })
+        if UmbrellaHold.objects.active().filter(reserved_umbrella_id=self.reserved_umbrella_id,
+                                                reservation_start_date__lte=self.reservation_end_date,
+                                                reservation_end_date__gte=self.reservation_start_date).exists():
+            raise ValidationError({
+                'reservation_end_date': "We are sorry, this umbrella is already occupied for the selected period",
+                'reservation_start_date': "We are sorry, this umbrella is already occupied for the selected period"
+            })
 
     def clean(self):
         super(UmbrellaReservation, self).clean()
         self.validate_end_date_after_start_date()
         self.validate_overlapping_reservations()
 
+    def save(self, *args, **kwargs):
+        self.booked_days = (self.reservation_end_date - self.reservation_start_date).days + 1
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'booked_days' not in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'booked_days'}
+        super(UmbrellaReservation, self).save(*args, **kwargs)
+
     def __str__(self) -> str:
         return f"{self.id}: {self.customer} from {self.reservation_start_date} to {self.reservation_end_date}"
+
+
+class RecurringUmbrellaReservation(models.Model):
+    """A season pass: the same umbrella booked on the given weekdays of every week between the two dates."""
+    customer = models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
+    number_of_seats = models.PositiveIntegerField(
+        validators=[MinValueValidator(utils.MIN_SEAT_UMBRELLA), MaxValueValidator(utils.MAX_SEAT_UMBRELLA)])
+
+    recurrence_start_date = models.DateField(db_index=True)
+    recurrence_end_date = models.DateField()
+    # Bitmask of the booked weekdays, bit 0 is Monday (see beachreservation.recurrence)
+    weekdays = models.PositiveSmallIntegerField(
+        validators=[MinValueValidator(1), MaxValueValidator(recurrence.ALL_WEEKDAYS)])
+
+    reserved_umbrella_id = models.PositiveIntegerField(
+        db_index=True, validators=[MinValueValidator(utils.MIN_UMBRELLA_ID), MaxValueValidator(utils.MAX_UMBRELLA_ID)])
+
+    @property
+    def booked_days(self):
+        return recurrence.count_occurrences(self.recurrence_start_date, self.recurrence_end_date, self.weekdays)
+
+    @property
+    def reservation_price(self):
+        return pricing.reservation_price(self.number_of_seats, self.booked_days)
+
+    def overlaps_range(self, start_date, end_date):
+        return recurrence.recurrence_overlaps_range(self.recurrence_start_date, self.recurrence_end_date,
+                                                    self.weekdays, start_date, end_date)
+
+    def validate_end_date_after_start_date(self):
+        if self.recurrence_start_date > self.recurrence_end_date:
+            raise ValidationError({'recurrence_end_date': "End date must be after start date"})
+
+    def validate_at_least_one_occurrence(self):
+        if self.booked_days == 0:
+            raise ValidationError({'weekdays': "None of the selected weekdays falls in the selected period"})
+
+    def validate_overlapping_reservations(self):
+        occupied_error = ValidationError({
+            'recurrence_end_date': "We are sorry, this umbrella is already occupied for the selected period",
+            'recurrence_start_date': "We are sorry, this umbrella is already occupied for the selected period"
+        })
+        reservations = UmbrellaReservation.objects.filter(reserved_umbrella_id=self.reserved_umbrella_id,
+                                                          reservation_start_date__lte=self.recurrence_end_date,
+                                                          reservation_end_date__gte=self.recurrence_start_date)
+        for res in reservations:
+            if self.overlaps_range(res.reservation_start_date, res.reservation_end_date):
+                raise occupied_error
+
+        recurring_reservations = RecurringUmbrellaReservation.objects.filter(
+            reserved_umbrella_id=self.reserved_umbrella_id,
+            recurrence_start_date__lte=self.recurrence_end_date,
+            recurrence_end_date__gte=self.recurrence_start_date).exclude(id=self.id)
+        for res in recurring_reservations:
+            if recurrence.recurrences_overlap(res.recurrence_start_date, res.recurrence_end_date, res.weekdays,
+                                              self.recurrence_start_date, self.recurrence_end_date, self.weekdays):
+                raise occupied_error
+
+        holds = UmbrellaHold.objects.active().filter(reserved_umbrella_id=self.reserved_umbrella_id,
+                                                     reservation_start_date__lte=self.recurrence_end_date,
+                                                     reservation_end_date__gte=self.recurrence_start_date)
+        for hold in holds:
+            if self.overlaps_range(hold.reservation_start_date, hold.reservation_end_date):
+                raise occupied_error
+
+    def clean(self):
+        super(RecurringUmbrellaReservation, self).clean()
+        self.validate_end_date_after_start_date()
+        self.validate_at_least_one_occurrence()
+        self.validate_overlapping_reservations()
+
+    def __str__(self) -> str:
+        return f"{self.id}: {self.customer} every {recurrence.weekday_names(self.weekdays)} from {self.recurrence_start_date} " \
+               f"to {self.recurrence_end_date}"
+
+
+def get_hold_duration():
+    return datetime.timedelta(seconds=getattr(settings, 'BEACHRESERVATION_HOLD_SECONDS', 5 * 60))
+
+
+class UmbrellaHoldQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(expires_at__gt=timezone.now())
+
+    def expired(self):
+        return self.filter(expires_at__lte=timezone.now())
+
+    def purge_expired(self, batch_size=1000):
+        """Delete one batch of expired holds, oldest first, returns how many were deleted.
+
+        The batch is found through the expires_at index, the active holds are never read.
+        """
+        expired_ids = list(self.expired().order_by('expires_at').values_list('id', flat=True)[:batch_size])
+        if not expired_ids:
+            return 0
+        return self.filter(id__in=expired_ids).delete()[0]
+
+
+class UmbrellaHold(models.Model):
+    """An umbrella kept aside for a few minutes while its customer completes the booking.
+
+    An active hold occupies the umbrella exactly like a reservation. It either becomes a reservation or expires, the
+    expired holds are ignored by every query and deleted in batches. The availability stream only hears about an
+    expired hold once it is deleted: run expire_umbrella_holds often for the subscribers to see the umbrella free up.
+    """
+    customer = models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
+    number_of_seats = models.PositiveIntegerField(
+        validators=[MinValueValidator(utils.MIN_SEAT_UMBRELLA), MaxValueValidator(utils.MAX_SEAT_UMBRELLA)])
+
+    reservation_start_date = models.DateField()
+    reservation_end_date = models.DateField()
+
+    reserved_umbrella_id = models.PositiveIntegerField(
+        validators=[MinValueValidator(utils.MIN_UMBRELLA_ID), MaxValueValidator(utils.MAX_UMBRELLA_ID)])
+
+    expires_at = models.DateTimeField(db_index=True)
+
+    objects = UmbrellaHoldQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['reserved_umbrella_id', 'reservation_start_date']),
+            models.Index(fields=['customer', 'expires_at']),
+        ]
+
+    @property
+    def reservation_price(self):
+        return self.as_reservation().reservation_price
+
+    def as_reservation(self):
+        return UmbrellaReservation(customer_id=self.customer_id, number_of_seats=self.number_of_seats,
+                                   reservation_start_date=self.reservation_start_date,
+                                   reservation_end_date=self.reservation_end_date,
+                                   reserved_umbrella_id=self.reserved_umbrella_id)
+
+    def validate_active_holds_per_customer(self):
+        if UmbrellaHold.objects.active().filter(customer_id=self.customer_id).exclude(id=self.id).count() >= \
+                utils.MAX_ACTIVE_HOLDS_PER_CUSTOMER:
+            raise ValidationError(f"At most {utils.MAX_ACTIVE_HOLDS_PER_CUSTOMER} umbrellas can be held at once")
+
+    def clean(self):
+        super(UmbrellaHold, self).clean()
+        # Held umbrellas follow the same rules as the reservations they will become
+        reservation = self.as_reservation()
+        reservation.validate_end_date_after_start_date()
+        reservation.validate_overlapping_reservations()
+        if self.customer_id is not None:
+            self.validate_active_holds_per_customer()
+
+    def save(self, *args, **kwargs):
+        if self.expires_at is None:
+            self.expires_at = timezone.now() + get_hold_duration()
+        super(UmbrellaHold, self).save(*args, **kwargs)
+
+    def __str__(self) -> str:
+        return f"{self.id}: umbrella {self.reserved_umbrella_id} held by {self.customer} until {self.expires_at}"
+
+
+class ReservationChange(models.Model):
+    """Append-only log of the reservations created and cancelled, read by the clients to sync incrementally.
+
+    Only the single reservations are logged, the season passes (RecurringUmbrellaReservation) aren't part of the feed.
+    """
+    CREATED = 'created'
+    CANCELLED = 'cancelled'
+    KIND_CHOICES = [(CREATED, 'Created'), (CANCELLED, 'Cancelled')]
+
+    # Monotonic, never reused: clients ask for the changes after the last sequence number they have seen
+    seq = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=9, choices=KIND_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    # Copy of the reservation, which doesn't exist anymore once cancelled. The customer may be gone as well: the log
+    # outlives them so that the clients are told about the cancellation of their reservations
+    reservation_id = models.BigIntegerField()
+    customer = models.ForeignKey(get_user_model(), on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    number_of_seats = models.PositiveIntegerField()
+    reservation_start_date = models.DateField()
+    reservation_end_date = models.DateField()
+    reserved_umbrella_id = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['customer', 'seq']),
+        ]
+
+    @classmethod
+    def record(cls, kind, reservation):
+        return cls.objects.create(kind=kind, reservation_id=reservation.id, customer_id=reservation.customer_id,
+                                  number_of_seats=reservation.number_of_seats,
+                                  reservation_start_date=reservation.reservation_start_date,
+                                  reservation_end_date=reservation.reservation_end_date,
+                                  reserved_umbrella_id=reservation.reserved_umbrella_id)
+
+    def __str__(self) -> str:
+        return f"{self.seq}: reservation {self.reservation_id} {self.kind}"
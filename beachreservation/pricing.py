@@ -0,0 +1,22 @@
+from decimal import Decimal, Context, localcontext
+
+from beachreservation import utils
+
+# The prices have always been reported with 4 significant digits
+PRICE_CONTEXT = Context(prec=4)
+
+
+def booked_days(start_date, end_date):
+    return (end_date - start_date).days + 1
+
+
+def reservation_price(number_of_seats, booked_days):
+    """Price of an umbrella booked for the given number of days, shared by every kind of reservation and quote."""
+    with localcontext(PRICE_CONTEXT):
+        return Decimal(f"{utils.UMBRELLA_BASE_COST}") + utils.SEAT_COST_PER_DAY * number_of_seats * booked_days
+
+
+def quote_prices(candidates):
+    """Prices of (number_of_seats, start_date, end_date) candidates, as the reservations would report them."""
+    return [reservation_price(number_of_seats, booked_days(start_date, end_date))
+            for number_of_seats, start_date, end_date in candidates]
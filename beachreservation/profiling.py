@@ -0,0 +1,261 @@
+"""On-demand profiling of single requests, for the beach managers.
+
+A request carrying the ``X-Profile: 1`` header or the ``profile=1`` query parameter, made by a beach manager, runs
+under cProfile with every SQL statement recorded. The profile covers the whole middleware chain as long as
+``ProfilingMiddleware`` is the first middleware. Its summary (time and queries spent in the middleware, authentication
+and permissions, ``get_queryset``, serialization and rendering) and the raw cProfile dump are stored in
+``settings.BEACHRESERVATION_PROFILES_DIR``; the response points to them in the ``X-Profile-Id`` header and they can be
+downloaded from ``/api/v1/beachreservation/profiles/<id>``.
+
+Requests without the flag only pay for one header lookup. Flagged requests are profiled at most
+``BEACHRESERVATION_PROFILES_PER_MINUTE`` times a minute and one at a time per process, only the newest
+``BEACHRESERVATION_PROFILES_KEPT`` profiles are kept. The per-minute counter lives in the default cache: with several
+processes it must be a shared backend, with the default local memory cache every process has its own budget.
+"""
+import cProfile
+import json
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from importlib import import_module
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.contrib import auth
+from django.core.cache import cache
+from django.db import connections
+from rest_framework.authtoken.models import Token
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_QUERY_PARAMETER = 'profile'
+PROFILE_ID_HEADER = 'X-Profile-Id'
+PROFILE_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+DEFAULT_PROFILES_PER_MINUTE = 10
+DEFAULT_PROFILES_KEPT = 50
+MAX_RECORDED_QUERIES = 500
+TOP_FUNCTIONS = 30
+
+MIDDLEWARE = 'middleware'
+AUTHENTICATION = 'authentication'
+GET_QUERYSET = 'get_queryset'
+SERIALIZATION = 'serialization'
+RENDERING = 'rendering'
+VIEW = 'view'
+PHASES = (MIDDLEWARE, AUTHENTICATION, GET_QUERYSET, SERIALIZATION, RENDERING, VIEW)
+
+# Functions opening a phase, matched on their name. The innermost match on the stack gives the phase of a query
+PHASE_FUNCTIONS = {
+    'perform_authentication': AUTHENTICATION,
+    'check_permissions': AUTHENTICATION,
+    'check_object_permissions': AUTHENTICATION,
+    'get_queryset': GET_QUERYSET,
+    'to_representation': SERIALIZATION,
+    'rendered_content': RENDERING,
+    'dispatch': VIEW,
+}
+
+_profiling_lock = threading.Lock()
+
+
+def get_profiles_dir():
+    return settings.BEACHRESERVATION_PROFILES_DIR
+
+
+def get_profile_paths(profile_id):
+    """Paths of the summary and of the cProfile dump, None for anything that isn't a profile id."""
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    directory = get_profiles_dir()
+    return directory / f'{profile_id}.json', directory / f'{profile_id}.prof'
+
+
+def is_profiling_requested(request):
+    if request.META.get(PROFILE_HEADER):
+        return request.META[PROFILE_HEADER] == '1'
+    return PROFILE_QUERY_PARAMETER in request.META.get('QUERY_STRING', '') and \
+        request.GET.get(PROFILE_QUERY_PARAMETER) == '1'
+
+
+def get_requesting_user(request):
+    """The user making the request, found without going through the rest of the middleware chain."""
+    authorization = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(authorization) == 2 and authorization[0].lower() == 'token':
+        token = Token.objects.select_related('user').filter(key=authorization[1]).first()
+        return token.user if token is not None else None
+    session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if session_key is None:
+        return None
+    session = import_module(settings.SESSION_ENGINE).SessionStore(session_key)
+    return auth.get_user(SimpleNamespace(session=session))
+
+
+def is_beach_manager(user):
+    return user is not None and user.is_authenticated and user.is_active and \
+        user.groups.filter(name='beach-managers').exists()
+
+
+def acquire_sample():
+    """Take one of the profiles allowed this minute, False once they are all taken."""
+    key = f'beachreservation:profiles:{int(time.time() // 60)}'
+    cache.add(key, 0, timeout=60)
+    try:
+        return cache.incr(key) <= getattr(settings, 'BEACHRESERVATION_PROFILES_PER_MINUTE', DEFAULT_PROFILES_PER_MINUTE)
+    except ValueError:
+        # The key expired in between
+        return False
+
+
+def phase_of_current_stack():
+    frame = sys._getframe(2)
+    while frame is not None:
+        phase = PHASE_FUNCTIONS.get(frame.f_code.co_name)
+        if phase is not None:
+            return phase
+        frame = frame.f_back
+    return MIDDLEWARE
+
+
+class QueryRecorder:
+    """Database execute wrapper recording the statements, their duration and the phase that ran them."""
+
+    def __init__(self):
+        self.queries = []
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.count += 1
+            if len(self.queries) < MAX_RECORDED_QUERIES:
+                self.queries.append({'phase': phase_of_current_stack(), 'alias': context['connection'].alias,
+                                     'duration_ms': round(duration * 1000, 3), 'sql': sql})
+
+
+def phase_durations(stats, total):
+    """Seconds spent in every phase, from the cumulative times of the functions opening it.
+
+    Calls coming from a function of the same phase are skipped, nested serializers or repeated dispatch calls would
+    otherwise be counted several times. Rendering happens after the view has returned, the middleware get the rest.
+    """
+    durations = dict.fromkeys(PHASES, 0.0)
+    functions_by_phase = {}
+    for function in stats.stats:
+        phase = PHASE_FUNCTIONS.get(function[2])
+        if phase is not None:
+            functions_by_phase.setdefault(phase, set()).add(function)
+    for phase, functions in functions_by_phase.items():
+        for function in functions:
+            callers = stats.stats[function][4]
+            durations[phase] += sum(edge[3] for caller, edge in callers.items() if caller not in functions)
+    # The phases inside the view are part of the time of its dispatch
+    durations[VIEW] = max(0.0, durations[VIEW] - durations[AUTHENTICATION] - durations[GET_QUERYSET] -
+                          durations[SERIALIZATION])
+    durations[MIDDLEWARE] = max(0.0, total - sum(durations[phase] for phase in PHASES if phase != MIDDLEWARE))
+    return durations
+
+
+def top_functions(stats):
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+    return [{'function': f'{file_name}:{line}({name})', 'calls': calls, 'own_ms': round(own_time * 1000, 3),
+             'cumulative_ms': round(cumulative_time * 1000, 3)}
+            for (file_name, line, name), (_, calls, own_time, cumulative_time, _) in rows]
+
+
+def build_summary(request, response, user, profiler, recorder, total):
+    stats = pstats.Stats(profiler)
+    durations = phase_durations(stats, total)
+    query_counts = dict.fromkeys(PHASES, 0)
+    query_durations = dict.fromkeys(PHASES, 0.0)
+    for query in recorder.queries:
+        query_counts[query['phase']] += 1
+        query_durations[query['phase']] += query['duration_ms']
+    return {
+        'method': request.method,
+        'path': request.get_full_path(),
+        'user': user.get_username(),
+        'status_code': response.status_code,
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'total_ms': round(total * 1000, 3),
+        'phases': {phase: {'duration_ms': round(durations[phase] * 1000, 3), 'queries': query_counts[phase],
+                           'query_duration_ms': round(query_durations[phase], 3)} for phase in PHASES},
+        'query_count': recorder.count,
+        'queries': recorder.queries,
+        'queries_truncated': recorder.count > len(recorder.queries),
+        'top_functions': top_functions(stats),
+    }
+
+
+def store_profile(summary, profiler):
+    directory = get_profiles_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    profile_id = uuid.uuid4().hex
+    summary_path, dump_path = get_profile_paths(profile_id)
+    profiler.dump_stats(dump_path)
+    summary_path.write_text(json.dumps(dict(summary, id=profile_id), indent=2))
+
+    kept = getattr(settings, 'BEACHRESERVATION_PROFILES_KEPT', DEFAULT_PROFILES_KEPT)
+    summaries = sorted(directory.glob('*.json'), key=lambda path: path.stat().st_mtime, reverse=True)
+    for old_summary in summaries[kept:]:
+        old_summary.unlink(missing_ok=True)
+        old_summary.with_suffix('.prof').unlink(missing_ok=True)
+    return profile_id
+
+
+class ProfilingMiddleware:
+    """Profile the flagged requests of the beach managers, must come first in settings.MIDDLEWARE."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not is_profiling_requested(request):
+            return self.get_response(request)
+
+        user = get_requesting_user(request)
+        if not is_beach_manager(user):
+            return self.get_response(request)
+        if not _profiling_lock.acquire(blocking=False):
+            return self.skip(request, 'busy')
+        # The lock is only held while profiling, a skipped request would otherwise make the others busy
+        if not acquire_sample():
+            _profiling_lock.release()
+            return self.skip(request, 'rate-limited')
+        try:
+            return self.profile(request, user)
+        finally:
+            _profiling_lock.release()
+
+    def skip(self, request, reason):
+        response = self.get_response(request)
+        response['X-Profile-Skipped'] = reason
+        return response
+
+    def profile(self, request, user):
+        recorder = QueryRecorder()
+        profiler = cProfile.Profile()
+        wrappers = [connection.execute_wrapper(recorder) for connection in connections.all()]
+        for wrapper in wrappers:
+            wrapper.__enter__()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+            # Streaming and template responses are rendered later, make sure the rendering is part of the profile
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+        finally:
+            profiler.disable()
+            total = time.perf_counter() - started
+            for wrapper in reversed(wrappers):
+                wrapper.__exit__(None, None, None)
+
+        profile_id = store_profile(build_summary(request, response, user, profiler, recorder, total), profiler)
+        response[PROFILE_ID_HEADER] = profile_id
+        return response
@@ -0,0 +1,62 @@
+import datetime
+
+# Weekdays are stored as a bitmask where bit 0 is Monday and bit 6 is Sunday (as in date.weekday())
+MONDAY = 1 << 0
+TUESDAY = 1 << 1
+WEDNESDAY = 1 << 2
+THURSDAY = 1 << 3
+FRIDAY = 1 << 4
+SATURDAY = 1 << 5
+SUNDAY = 1 << 6
+WEEKEND = SATURDAY | SUNDAY
+ALL_WEEKDAYS = (1 << 7) - 1
+WEEKDAY_NAMES = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+
+
+def count_weekdays(weekdays):
+    return bin(weekdays & ALL_WEEKDAYS).count('1')
+
+
+def weekday_names(weekdays):
+    return ', '.join(name for day, name in enumerate(WEEKDAY_NAMES) if weekdays & (1 << day))
+
+
+def weekday_mask_for_range(start_date, end_date):
+    """Bitmask of the weekdays touched by the closed range [start_date, end_date], computed without iterating."""
+    days = (end_date - start_date).days + 1
+    if days <= 0:
+        return 0
+    if days >= 7:
+        return ALL_WEEKDAYS
+    mask = ((1 << days) - 1) << start_date.weekday()
+    # Wrap the days falling after Sunday back to the start of the week
+    return (mask | (mask >> 7)) & ALL_WEEKDAYS
+
+
+def count_occurrences(start_date, end_date, weekdays):
+    """Number of days in [start_date, end_date] whose weekday is in the weekdays bitmask."""
+    days = (end_date - start_date).days + 1
+    if days <= 0:
+        return 0
+    full_weeks, remaining_days = divmod(days, 7)
+    occurrences = full_weeks * count_weekdays(weekdays)
+    if remaining_days:
+        tail_start = start_date + datetime.timedelta(days=full_weeks * 7)
+        occurrences += count_weekdays(weekdays & weekday_mask_for_range(tail_start, end_date))
+    return occurrences
+
+
+def recurrence_overlaps_range(recurrence_start_date, recurrence_end_date, weekdays, start_date, end_date):
+    """True if at least one occurrence of the recurrence falls inside [start_date, end_date]."""
+    lower = max(recurrence_start_date, start_date)
+    upper = min(recurrence_end_date, end_date)
+    if lower > upper:
+        return False
+    return bool(weekdays & weekday_mask_for_range(lower, upper))
+
+
+def recurrences_overlap(first_start_date, first_end_date, first_weekdays,
+                        second_start_date, second_end_date, second_weekdays):
+    """True if the two recurrences share at least one occurrence day."""
+    return recurrence_overlaps_range(first_start_date, first_end_date, first_weekdays & second_weekdays,
+                                     second_start_date, second_end_date)
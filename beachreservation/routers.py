@@ -0,0 +1,63 @@
+"""Read/write routing between the primary database and a read replica.
+
+The reads of the beachreservation views go to ``settings.BEACHRESERVATION_READ_REPLICA`` when it is set, everything
+else (writes, reads done while handling a write, other apps) keeps using the primary. A user who has just created or
+destroyed something is pinned to the primary for ``BEACHRESERVATION_READ_YOUR_WRITES_SECONDS`` so that they always
+read their own writes, whatever the replication lag. The pins live in the default cache: with several processes it
+must be a shared backend.
+"""
+import contextvars
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+APP_LABEL = 'beachreservation'
+
+_replica_reads = contextvars.ContextVar('beachreservation_replica_reads', default=False)
+
+
+def get_read_replica():
+    return getattr(settings, 'BEACHRESERVATION_READ_REPLICA', None)
+
+
+def _pin_key(user):
+    return f'beachreservation:primary-pin:{user.pk}'
+
+
+def pin_to_primary(user):
+    cache.set(_pin_key(user), True, timeout=getattr(settings, 'BEACHRESERVATION_READ_YOUR_WRITES_SECONDS', 5))
+
+
+def is_pinned_to_primary(user):
+    return user.is_authenticated and cache.get(_pin_key(user), False)
+
+
+def set_replica_reads(enabled):
+    return _replica_reads.set(enabled)
+
+
+def reset_replica_reads(token):
+    _replica_reads.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != APP_LABEL:
+            return None
+        replica = get_read_replica()
+        if replica and _replica_reads.get():
+            return replica
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Never fall back on the database an instance has been read from, that could be the replica
+        if model._meta.app_label == APP_LABEL:
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, get_read_replica()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
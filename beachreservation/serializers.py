@@ -3,7 +3,9 @@ import datetime
 from django.core.exceptions import ValidationError
 from rest_framework import serializers
 
-from beachreservation.models import UmbrellaReservation
+from beachreservation import utils
+from beachreservation.models import UmbrellaReservation, RecurringUmbrellaReservation, ReservationChange, \
+    UmbrellaHold
 
 
 def check_if_data_is_after_or_equal_today(date):
@@ -47,3 +49,78 @@ class RestrictedUmbrellaReservationSerializer(serializers.ModelSerializer):
         instance = UmbrellaReservation(**attrs)
         check_if_model_is_clean(instance)
         return attrs
+
+
+class FullRecurringUmbrellaReservationSerializer(serializers.ModelSerializer):
+    class Meta:
+        fields = (
+            'id', 'customer', 'number_of_seats', 'recurrence_start_date', 'recurrence_end_date', 'weekdays',
+            'reserved_umbrella_id', 'booked_days', 'reservation_price')
+        model = RecurringUmbrellaReservation
+
+
+class RestrictedRecurringUmbrellaReservationSerializer(serializers.ModelSerializer):
+    class Meta:
+        fields = (
+            'id', 'number_of_seats', 'recurrence_start_date', 'recurrence_end_date', 'weekdays',
+            'reserved_umbrella_id')
+        model = RecurringUmbrellaReservation
+
+    @staticmethod
+    def validate_recurrence_start_date(date):
+        check_if_data_is_after_or_equal_today(date)
+        return date
+
+    @staticmethod
+    def validate_recurrence_end_date(date):
+        check_if_data_is_after_or_equal_today(date)
+        return date
+
+    def validate(self, attrs):
+        instance = RecurringUmbrellaReservation(**attrs)
+        check_if_model_is_clean(instance)
+        return attrs
+
+
+class UmbrellaReservationQuoteSerializer(serializers.Serializer):
+    number_of_seats = serializers.IntegerField(min_value=utils.MIN_SEAT_UMBRELLA, max_value=utils.MAX_SEAT_UMBRELLA)
+    reservation_start_date = serializers.DateField()
+    reservation_end_date = serializers.DateField()
+    reserved_umbrella_id = serializers.IntegerField(min_value=utils.MIN_UMBRELLA_ID, max_value=utils.MAX_UMBRELLA_ID)
+
+    def validate(self, attrs):
+        if attrs['reservation_start_date'] > attrs['reservation_end_date']:
+            raise serializers.ValidationError({'reservation_end_date': "End date must be after start date"})
+        return attrs
+
+
+class UmbrellaHoldSerializer(serializers.ModelSerializer):
+    class Meta:
+        fields = (
+            'id', 'customer', 'number_of_seats', 'reservation_start_date', 'reservation_end_date',
+            'reserved_umbrella_id', 'expires_at', 'reservation_price')
+        read_only_fields = ('customer', 'expires_at')
+        model = UmbrellaHold
+
+    @staticmethod
+    def validate_reservation_start_date(date):
+        check_if_data_is_after_or_equal_today(date)
+        return date
+
+    @staticmethod
+    def validate_reservation_end_date(date):
+        check_if_data_is_after_or_equal_today(date)
+        return date
+
+    def validate(self, attrs):
+        instance = UmbrellaHold(customer=self.context['request'].user, **attrs)
+        check_if_model_is_clean(instance)
+        return attrs
+
+
+class ReservationChangeSerializer(serializers.ModelSerializer):
+    class Meta:
+        fields = (
+            'seq', 'kind', 'created_at', 'reservation_id', 'customer', 'number_of_seats', 'reservation_start_date',
+            'reservation_end_date', 'reserved_umbrella_id')
+        model = ReservationChange
@@ -0,0 +1,64 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from beachreservation.events import availability_broker, RESERVED, RELEASED
+from beachreservation.models import UmbrellaReservation, RecurringUmbrellaReservation, ReservationChange, UmbrellaHold
+
+
+def publish_on_commit(event_type, umbrella_id, start_date, end_date, **kwargs):
+    # Subscribers must never be told about a change that is then rolled back
+    transaction.on_commit(lambda: availability_broker.publish(event_type, umbrella_id, start_date, end_date, **kwargs))
+
+
+@receiver(post_save, sender=UmbrellaReservation)
+def record_created_reservation(sender, instance, created, **kwargs):
+    # Runs in the transaction of the save when there is one, the views create reservations atomically
+    if created:
+        ReservationChange.record(ReservationChange.CREATED, instance)
+
+
+@receiver(post_delete, sender=UmbrellaReservation)
+def record_cancelled_reservation(sender, instance, **kwargs):
+    # Also when the reservation goes away with its customer, the clients that synced it must drop it
+    ReservationChange.record(ReservationChange.CANCELLED, instance)
+
+
+@receiver(post_save, sender=UmbrellaReservation)
+def publish_created_reservation(sender, instance, created, **kwargs):
+    if created:
+        publish_on_commit(RESERVED, instance.reserved_umbrella_id, instance.reservation_start_date,
+                          instance.reservation_end_date)
+
+
+@receiver(post_delete, sender=UmbrellaReservation)
+def publish_destroyed_reservation(sender, instance, **kwargs):
+    publish_on_commit(RELEASED, instance.reserved_umbrella_id, instance.reservation_start_date,
+                      instance.reservation_end_date)
+
+
+@receiver(post_save, sender=RecurringUmbrellaReservation)
+def publish_created_recurring_reservation(sender, instance, created, **kwargs):
+    if created:
+        publish_on_commit(RESERVED, instance.reserved_umbrella_id, instance.recurrence_start_date,
+                          instance.recurrence_end_date, weekdays=instance.weekdays)
+
+
+@receiver(post_delete, sender=RecurringUmbrellaReservation)
+def publish_destroyed_recurring_reservation(sender, instance, **kwargs):
+    publish_on_commit(RELEASED, instance.reserved_umbrella_id, instance.recurrence_start_date,
+                      instance.recurrence_end_date, weekdays=instance.weekdays)
+
+
+@receiver(post_save, sender=UmbrellaHold)
+def publish_created_hold(sender, instance, created, **kwargs):
+    if created:
+        publish_on_commit(RESERVED, instance.reserved_umbrella_id, instance.reservation_start_date,
+                          instance.reservation_end_date)
+
+
+@receiver(post_delete, sender=UmbrellaHold)
+def publish_destroyed_hold(sender, instance, **kwargs):
+    # Released, confirmed or expired: in every case the hold doesn't occupy the umbrella anymore
+    publish_on_commit(RELEASED, instance.reserved_umbrella_id, instance.reservation_start_date,
+                      instance.reservation_end_date)
@@ -1,10 +1,19 @@
 from django.urls import path
 from rest_framework.routers import SimpleRouter
 
-from beachreservation.views import UmbrellaReservationsListCreateDestroyViewSet, FreeUmbrellaInADateRange
+from beachreservation.views import UmbrellaReservationsListCreateDestroyViewSet, FreeUmbrellaInADateRange, \
+    RecurringUmbrellaReservationsListCreateDestroyViewSet, UmbrellaReservationQuote, \
+    UmbrellaHoldsListCreateDestroyViewSet, RequestProfiles
 
 router = SimpleRouter()
 
+# Prefixed routes go first, the reservations detail route would otherwise shadow them
+router.register('recurring', RecurringUmbrellaReservationsListCreateDestroyViewSet, basename='recurring-reservations')
+router.register('holds', UmbrellaHoldsListCreateDestroyViewSet, basename='holds')
 router.register('', UmbrellaReservationsListCreateDestroyViewSet, basename='reservations')
 urlpatterns = router.urls
 urlpatterns.append(path('freeumbrella', FreeUmbrellaInADateRange.as_view()))
+urlpatterns.append(path('quote', UmbrellaReservationQuote.as_view()))
+urlpatterns.append(path('profiles', RequestProfiles.as_view()))
+urlpatterns.append(path('profiles/<str:profile_id>', RequestProfiles.as_view()))
+urlpatterns.append(path('profiles/<str:profile_id>/pstats', RequestProfiles.as_view(), {'dump': True}))
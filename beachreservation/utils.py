@@ -3,3 +3,5 @@ MAX_SEAT_UMBRELLA = 4
 MAX_UMBRELLA_ID = 50
 MIN_UMBRELLA_ID = 1
 UMBRELLA_BASE_COST = 20.00
+SEAT_COST_PER_DAY = 10
+MAX_ACTIVE_HOLDS_PER_CUSTOMER = 3
@@ -1,27 +1,68 @@
 import datetime
+import json
 
-from django.db.models import Q
+from django.db import transaction
+from django.http import FileResponse, Http404
+from django.db.models import Max, Min
 from rest_framework import permissions, mixins, viewsets
+from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
-from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST
+from rest_framework.exceptions import ValidationError, PermissionDenied
+from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED, HTTP_400_BAD_REQUEST, HTTP_410_GONE
 from rest_framework.views import APIView
 
 from beachreservation import utils
-from beachreservation.models import UmbrellaReservation
-from beachreservation.serializers import RestrictedUmbrellaReservationSerializer, FullUmbrellaReservationSerializer
+from beachreservation.availability import occupied_umbrella_ids, batch_availability
+from beachreservation.filters import ReservationSearchFilter
+from beachreservation.models import UmbrellaReservation, RecurringUmbrellaReservation, ReservationChange, \
+    UmbrellaHold
+from beachreservation.pricing import quote_prices
+from beachreservation.profiling import get_profile_paths, get_profiles_dir, is_beach_manager
+from beachreservation.routers import set_replica_reads, reset_replica_reads, is_pinned_to_primary, pin_to_primary
+from beachreservation.serializers import RestrictedUmbrellaReservationSerializer, FullUmbrellaReservationSerializer, \
+    RestrictedRecurringUmbrellaReservationSerializer, FullRecurringUmbrellaReservationSerializer, \
+    UmbrellaReservationQuoteSerializer, ReservationChangeSerializer, UmbrellaHoldSerializer, check_if_model_is_clean
+
+
+class ReplicaReadsMixin:
+    """Let the reads of safe requests go to the read replica, see beachreservation.routers."""
+    replica_read_methods = permissions.SAFE_METHODS
+
+    def dispatch(self, request, *args, **kwargs):
+        token = set_replica_reads(False)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            reset_replica_reads(token)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # Only decided once the user is authenticated: users who just wrote something keep reading the primary
+        set_replica_reads(request.method in self.replica_read_methods and not is_pinned_to_primary(request.user))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if response.status_code < 400 and request.method not in self.replica_read_methods and \
+                request.user.is_authenticated:
+            pin_to_primary(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
 
 
-class CreateListDestroyViewSet(mixins.CreateModelMixin, mixins.ListModelMixin, mixins.DestroyModelMixin,
-                               viewsets.GenericViewSet):
+class CreateListDestroyViewSet(ReplicaReadsMixin, mixins.CreateModelMixin, mixins.ListModelMixin,
+                               mixins.DestroyModelMixin, viewsets.GenericViewSet):
     pass
 
 
 class UmbrellaReservationsListCreateDestroyViewSet(CreateListDestroyViewSet):
     permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [ReservationSearchFilter]
+    max_changes = 500
 
     def get_serializer_class(self):
         if self.action == 'create':
             return RestrictedUmbrellaReservationSerializer
+        elif self.action == 'changes':
+            return ReservationChangeSerializer
         else:
             return FullUmbrellaReservationSerializer
 
@@ -34,11 +75,94 @@ class UmbrellaReservationsListCreateDestroyViewSet(CreateListDestroyViewSet):
         else:
             return UmbrellaReservation.objects.all().filter(customer=self.request.user)
 
+    @transaction.atomic
+    def perform_create(self, serializer):
+        # Atomic so that the reservation and its entry in the change log are committed together
+        serializer.save(customer=self.request.user)
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """Reservations created and cancelled after the `since` sequence number, oldest first.
+
+        Clients keep the `last_seq` of the response and pass it as `since` next time. A 410 means the changes they
+        asked for have been compacted: they must list their reservations again and resume from `latest_seq`.
+        """
+        try:
+            since = int(request.query_params.get('since', 0))
+        except ValueError:
+            raise ValidationError({'since': "Expected a sequence number"})
+
+        bounds = ReservationChange.objects.aggregate(oldest_seq=Min('seq'), latest_seq=Max('seq'))
+        if bounds['oldest_seq'] is not None and since < bounds['oldest_seq'] - 1:
+            return Response(data={'detail': "The requested changes have been compacted, list the reservations again",
+                                  'latest_seq': bounds['latest_seq']}, status=HTTP_410_GONE)
+
+        changes = ReservationChange.objects.filter(seq__gt=since)
+        if not self.request.user.groups.filter(name='beach-managers').exists():
+            changes = changes.filter(customer=self.request.user)
+        changes = list(changes.order_by('seq')[:self.max_changes + 1])
+
+        has_more = len(changes) > self.max_changes
+        changes = changes[:self.max_changes]
+        return Response(data={
+            'changes': self.get_serializer(changes, many=True).data,
+            'last_seq': changes[-1].seq if changes else since,
+            'has_more': has_more,
+        }, status=HTTP_200_OK)
+
+
+class RecurringUmbrellaReservationsListCreateDestroyViewSet(CreateListDestroyViewSet):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_serializer_class(self):
+        if self.action == 'create':
+            return RestrictedRecurringUmbrellaReservationSerializer
+        else:
+            return FullRecurringUmbrellaReservationSerializer
+
+    def get_queryset(self):
+        # Same visibility rules as the single reservations: beach managers see every season pass
+        if self.request.user.groups.filter(name='beach-managers').exists():
+            return RecurringUmbrellaReservation.objects.all()
+        else:
+            return RecurringUmbrellaReservation.objects.all().filter(customer=self.request.user)
+
     def perform_create(self, serializer):
         serializer.save(customer=self.request.user)
 
 
-class FreeUmbrellaInADateRange(APIView):
+class UmbrellaHoldsListCreateDestroyViewSet(CreateListDestroyViewSet):
+    """Umbrellas held for a few minutes during checkout: confirm a hold to turn it into a reservation, destroy it to
+    release the umbrella. Only the active holds are listed, the expired ones can't be confirmed anymore."""
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = UmbrellaHoldSerializer
+    # Expired holds deleted by each new hold, keeps the table small even without the expire_umbrella_holds command
+    purge_batch_size = 100
+
+    def get_queryset(self):
+        if self.request.user.groups.filter(name='beach-managers').exists():
+            return UmbrellaHold.objects.active()
+        else:
+            return UmbrellaHold.objects.active().filter(customer=self.request.user)
+
+    def perform_create(self, serializer):
+        UmbrellaHold.objects.purge_expired(batch_size=self.purge_batch_size)
+        serializer.save(customer=self.request.user)
+
+    @action(detail=True, methods=['post'])
+    @transaction.atomic
+    def confirm(self, request, pk=None):
+        # Only the customer holding the umbrella can confirm it, the holds of the others don't exist for them here
+        hold = get_object_or_404(UmbrellaHold.objects.active().filter(customer=request.user), pk=pk)
+        reservation = hold.as_reservation()
+        # The hold must be gone before the reservation is validated, it would otherwise occupy its own umbrella
+        hold.delete()
+        check_if_model_is_clean(reservation)
+        reservation.save()
+        return Response(data=FullUmbrellaReservationSerializer(reservation).data, status=HTTP_201_CREATED)
+
+
+class FreeUmbrellaInADateRange(ReplicaReadsMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     @staticmethod
@@ -54,14 +178,6 @@ class FreeUmbrellaInADateRange(APIView):
 
         return start_date, end_date
 
-    @staticmethod
-    def __query_for_umbrella_ids_with_overlapping_reservations(start_date, end_date):
-        criterion1 = Q(reservation_start_date__lte=end_date)
-        criterion2 = Q(reservation_end_date__gte=start_date)
-        res = UmbrellaReservation.objects.filter(criterion1 & criterion2).values_list(
-            'reserved_umbrella_id', flat=True)
-        return res
-
     def get(self, request):
         start_date_initial = request.GET.get('start_date', None)
         end_date_initial = request.GET.get('end_date', None)
@@ -71,8 +187,68 @@ class FreeUmbrellaInADateRange(APIView):
         except ValueError as e:
             return Response(data=e.args, status=HTTP_400_BAD_REQUEST)
 
-        overlapping_reservations_umbrella_id = self.__query_for_umbrella_ids_with_overlapping_reservations(start_date,
-                                                                                                           end_date)
+        overlapping_reservations_umbrella_id = occupied_umbrella_ids(start_date, end_date)
         free_umbrella_id = [i for i in range(utils.MIN_UMBRELLA_ID, utils.MAX_UMBRELLA_ID + 1) if
                             i not in overlapping_reservations_umbrella_id]
         return Response(data=free_umbrella_id, status=HTTP_200_OK)
+
+
+class UmbrellaReservationQuote(ReplicaReadsMixin, APIView):
+    """Price and availability of a list of candidate bookings, without creating any reservation."""
+    permission_classes = [permissions.IsAuthenticated]
+    # Quoting never writes anything
+    replica_read_methods = permissions.SAFE_METHODS + ('POST',)
+    max_candidates = 500
+
+    def post(self, request):
+        if not isinstance(request.data, list):
+            raise ValidationError("Expected a list of candidate reservations")
+        if len(request.data) > self.max_candidates:
+            raise ValidationError(f"At most {self.max_candidates} candidates can be quoted at once")
+
+        serializer = UmbrellaReservationQuoteSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        candidates = serializer.validated_data
+
+        prices = quote_prices([(c['number_of_seats'], c['reservation_start_date'], c['reservation_end_date'])
+                               for c in candidates])
+        availability = batch_availability([(c['reserved_umbrella_id'], c['reservation_start_date'],
+                                             c['reservation_end_date']) for c in candidates])
+        quotes = [dict(candidate, reservation_price=price, available=available)
+                  for candidate, price, available in zip(serializer.data, prices, availability)]
+        return Response(data=quotes, status=HTTP_200_OK)
+
+
+class RequestProfiles(APIView):
+    """Profiles of single requests taken on demand by the beach managers, see beachreservation.profiling.
+
+    Without an id lists the stored profiles, newest first. With an id returns the summary of that profile, or the
+    cProfile dump as a download when `pstats` follows the id.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    # The profiles aren't part of the API schema
+    schema = None
+
+    def get(self, request, profile_id=None, dump=False):
+        if not is_beach_manager(request.user):
+            raise PermissionDenied("Only the beach managers can read the profiles")
+
+        if profile_id is None:
+            directory = get_profiles_dir()
+            summaries = sorted(directory.glob('*.json'), key=lambda path: path.stat().st_mtime,
+                               reverse=True) if directory.exists() else []
+            profiles = []
+            for summary_path in summaries:
+                summary = json.loads(summary_path.read_text())
+                profiles.append({key: summary[key] for key in (
+                    'id', 'method', 'path', 'status_code', 'started_at', 'total_ms', 'query_count')})
+            return Response(data=profiles, status=HTTP_200_OK)
+
+        paths = get_profile_paths(profile_id)
+        if paths is None or not paths[0].exists():
+            raise Http404
+        summary_path, dump_path = paths
+        if dump:
+            return FileResponse(dump_path.open('rb'), as_attachment=True, filename=dump_path.name,
+                                content_type='application/octet-stream')
+        return Response(data=json.loads(summary_path.read_text()), status=HTTP_200_OK)
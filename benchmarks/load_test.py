@@ -0,0 +1,293 @@
+"""End-to-end concurrent load generator for the booking scenarios.
+
+Starts the project against a scratch SQLite database, registers customers through the auth endpoints and then drives
+a mix of freeumbrella, create, list and destroy requests from many concurrent workers. Run from the project root:
+
+    python -m benchmarks.load_test --customers 200 --workers 100 --duration 30 \\
+        --mix freeumbrella=50,create=25,list=15,destroy=10
+
+The report gives throughput, p50/p95/p99 latency, error and conflict rates per operation and checks the scratch
+database for double bookings once the run is over.
+"""
+import argparse
+import datetime
+import json
+import math
+import os
+import random
+import secrets
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+API_PREFIX = '/api/v1/beachreservation/'
+REGISTRATION_PATH = '/api/v1/auth/registration/'
+OCCUPIED_MESSAGE = "already occupied"
+OPERATIONS = ('freeumbrella', 'create', 'list', 'destroy')
+REGISTRATION_ATTEMPTS = 8
+
+
+def parse_mix(value):
+    mix = {}
+    for item in value.split(','):
+        operation, _, weight = item.partition('=')
+        if operation not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Unknown operation {operation!r}, expected one of {OPERATIONS}")
+        mix[operation] = float(weight)
+    return mix
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+class ScratchServer:
+    """The project served by runserver on a free port, backed by a freshly migrated scratch database."""
+
+    def __init__(self, database):
+        self.database = database
+        self.port = free_port()
+        self.url = f'http://127.0.0.1:{self.port}'
+        self.env = dict(os.environ, BEACHRESORT_DATABASE_NAME=str(database),
+                        DJANGO_SETTINGS_MODULE='BeachResortReservation.settings')
+        self.process = None
+
+    def __enter__(self):
+        subprocess.run([sys.executable, 'manage.py', 'migrate', '--verbosity', '0'], cwd=PROJECT_DIR,
+                       env=self.env, check=True)
+        self.process = subprocess.Popen(
+            [sys.executable, 'manage.py', 'runserver', f'127.0.0.1:{self.port}', '--noreload'],
+            cwd=PROJECT_DIR, env=self.env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                requests.get(self.url + API_PREFIX + 'freeumbrella', timeout=1)
+                return self
+            except requests.ConnectionError:
+                time.sleep(0.2)
+        self.__exit__(None, None, None)
+        raise RuntimeError("The server didn't start within 30 seconds")
+
+    def __exit__(self, *exc_info):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait(timeout=10)
+
+
+class SeedingError(Exception):
+    pass
+
+
+def register_customer(url, index, attempts=REGISTRATION_ATTEMPTS):
+    """Register one customer and return its token, retrying when the server is busy.
+
+    Failures while seeding aren't part of the measurements: SQLite answers "database is locked" and runserver resets
+    connections when too many registrations arrive at once, those are retried with a backoff.
+    """
+    for attempt in range(attempts):
+        # A fresh username every attempt, a reset connection doesn't tell whether the previous one was created
+        username = f'load-{index}-{secrets.token_hex(4)}'
+        password = f'Lt-{secrets.token_hex(12)}'
+        try:
+            response = requests.post(url + REGISTRATION_PATH, timeout=30, data={
+                'username': username, 'email': f'{username}@example.com', 'password1': password,
+                'password2': password})
+        except requests.ConnectionError:
+            pass
+        else:
+            if response.status_code < 500:
+                if not response.ok:
+                    raise SeedingError(f"Registration of customer {index} rejected: {response.status_code} "
+                                       f"{response.text[:200]}")
+                return response.json()['key']
+        time.sleep(min(0.1 * 2 ** attempt, 2) * (1 + random.random()))
+    raise SeedingError(f"Registration of customer {index} still failing after {attempts} attempts")
+
+
+class Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.conflicts = defaultdict(int)
+
+    def record(self, operation, latency, error=False, conflict=False):
+        with self._lock:
+            self.latencies[operation].append(latency)
+            if error:
+                self.errors[operation] += 1
+            if conflict:
+                self.conflicts[operation] += 1
+
+
+class Worker:
+    def __init__(self, url, token, args, stats, seed):
+        self.url = url + API_PREFIX
+        self.session = requests.Session()
+        self.session.headers['Authorization'] = f'Token {token}'
+        self.args = args
+        self.stats = stats
+        self.random = random.Random(seed)
+        self.owned_reservations = []
+
+    def random_range(self):
+        start_date = datetime.date.today() + datetime.timedelta(days=self.random.randrange(self.args.days))
+        return start_date, start_date + datetime.timedelta(days=self.random.randrange(self.args.max_length))
+
+    def freeumbrella(self):
+        start_date, end_date = self.random_range()
+        response = self.session.get(self.url + 'freeumbrella', params={'start_date': start_date,
+                                                                        'end_date': end_date})
+        return response.status_code != 200, False
+
+    def create(self):
+        start_date, end_date = self.random_range()
+        response = self.session.post(self.url, data={
+            'number_of_seats': self.random.randint(2, 4), 'reserved_umbrella_id': self.random.randint(
+                1, self.args.umbrellas), 'reservation_start_date': start_date, 'reservation_end_date': end_date})
+        if response.status_code == 201:
+            self.owned_reservations.append(response.json()['id'])
+            return False, False
+        conflict = response.status_code == 400 and OCCUPIED_MESSAGE in response.text
+        return not conflict, conflict
+
+    def list(self):
+        response = self.session.get(self.url)
+        return response.status_code != 200, False
+
+    def destroy(self):
+        reservation_id = self.owned_reservations.pop(self.random.randrange(len(self.owned_reservations)))
+        response = self.session.delete(f'{self.url}{reservation_id}/')
+        return response.status_code != 204, False
+
+    def run(self, deadline, operations, weights):
+        while time.monotonic() < deadline:
+            operation = self.random.choices(operations, weights)[0]
+            if operation == 'destroy' and not self.owned_reservations:
+                # Nothing to cancel yet, book something instead
+                operation = 'create'
+            started = time.perf_counter()
+            try:
+                error, conflict = getattr(self, operation)()
+            except requests.RequestException:
+                error, conflict = True, False
+            self.stats.record(operation, time.perf_counter() - started, error, conflict)
+
+
+def find_double_bookings(database):
+    with sqlite3.connect(database) as connection:
+        return connection.execute(
+            "SELECT a.id, b.id, a.reserved_umbrella_id FROM beachreservation_umbrellareservation a "
+            "JOIN beachreservation_umbrellareservation b ON a.reserved_umbrella_id = b.reserved_umbrella_id "
+            "AND a.id < b.id AND a.reservation_start_date <= b.reservation_end_date "
+            "AND a.reservation_end_date >= b.reservation_start_date").fetchall()
+
+
+def build_report(stats, elapsed, double_bookings):
+    report = {'elapsed_seconds': round(elapsed, 3), 'operations': {}}
+    total_requests = 0
+    for operation in OPERATIONS:
+        latencies = sorted(stats.latencies.get(operation, []))
+        if not latencies:
+            continue
+        total_requests += len(latencies)
+        report['operations'][operation] = {
+            'requests': len(latencies),
+            'throughput_rps': round(len(latencies) / elapsed, 2),
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+            'error_rate': round(stats.errors[operation] / len(latencies), 4),
+            'conflict_rate': round(stats.conflicts[operation] / len(latencies), 4),
+        }
+    report['total_requests'] = total_requests
+    report['throughput_rps'] = round(total_requests / elapsed, 2)
+    report['double_bookings'] = [{'reservation_ids': [a, b], 'umbrella_id': umbrella_id}
+                                 for a, b, umbrella_id in double_bookings]
+    return report
+
+
+def print_report(report):
+    print(f"{report['total_requests']} requests in {report['elapsed_seconds']} s "
+          f"({report['throughput_rps']} requests/s)")
+    print(f"{'operation':<13}{'requests':>9}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'errors':>9}{'conflicts':>11}")
+    for operation, row in report['operations'].items():
+        print(f"{operation:<13}{row['requests']:>9}{row['throughput_rps']:>9}{row['p50_ms']:>9}{row['p95_ms']:>9}"
+              f"{row['p99_ms']:>9}{row['error_rate']:>9.2%}{row['conflict_rate']:>11.2%}")
+    if report['double_bookings']:
+        print(f"DOUBLE BOOKINGS: {len(report['double_bookings'])}")
+        for double_booking in report['double_bookings']:
+            print(f"  umbrella {double_booking['umbrella_id']}: reservations {double_booking['reservation_ids']}")
+    else:
+        print("No double bookings")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--customers', type=int, default=50, help="customers registered before the run")
+    parser.add_argument('--workers', type=int, default=50, help="concurrent workers, each logged in as a customer")
+    parser.add_argument('--seed-workers', type=int, default=4,
+                        help="concurrent registrations while seeding the customers")
+    parser.add_argument('--duration', type=float, default=20, help="length of the run in seconds")
+    parser.add_argument('--mix', type=parse_mix, default='freeumbrella=50,create=25,list=15,destroy=10',
+                        help="comma separated operation=weight pairs")
+    parser.add_argument('--umbrellas', type=int, default=50, help="book only the first N umbrellas")
+    parser.add_argument('--days', type=int, default=7, help="book ranges starting in the next N days")
+    parser.add_argument('--max-length', type=int, default=3, help="maximum length of a booked range in days")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        database = Path(scratch_dir) / 'load_test.sqlite3'
+        with ScratchServer(database) as server:
+            # Seeded with bounded concurrency, the measured run is the only place where the server gets flooded
+            try:
+                with ThreadPoolExecutor(max_workers=args.seed_workers) as executor:
+                    tokens = list(executor.map(lambda i: register_customer(server.url, i), range(args.customers)))
+            except SeedingError as e:
+                print(f"Couldn't seed the customers: {e}", file=sys.stderr)
+                return 2
+
+            with ThreadPoolExecutor(max_workers=args.workers) as executor:
+                stats = Stats()
+                workers = [Worker(server.url, tokens[i % len(tokens)], args, stats, args.seed + i)
+                           for i in range(args.workers)]
+                operations, weights = list(args.mix), list(args.mix.values())
+                started = time.monotonic()
+                deadline = started + args.duration
+                for future in [executor.submit(worker.run, deadline, operations, weights) for worker in workers]:
+                    future.result()
+                elapsed = time.monotonic() - started
+
+        report = build_report(stats, elapsed, find_double_bookings(database))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 1 if report['double_bookings'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""Compare season passes stored as one recurring row against the same passes expanded into weekly rows.
+
+Run from the project root with:
+
+    python -m benchmarks.recurring_reservations [--customers 500] [--repeat 20]
+
+The benchmark works on a throwaway test database, the configured database is never touched.
+"""
+import argparse
+import datetime
+import os
+import timeit
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'BeachResortReservation.settings')
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment, teardown_test_environment  # noqa: E402
+
+from beachreservation import recurrence, utils  # noqa: E402
+from beachreservation.availability import umbrella_ids_with_overlapping_recurrences  # noqa: E402
+from beachreservation.models import UmbrellaReservation, RecurringUmbrellaReservation  # noqa: E402
+
+SEASON_START = datetime.date(2023, 6, 3)  # first Saturday of June
+SEASON_END = datetime.date(2023, 9, 24)  # last Sunday of September
+
+
+def table_size(model):
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) FROM "{table}"')
+        rows = cursor.fetchone()[0]
+        try:
+            # Only available when SQLite is compiled with SQLITE_ENABLE_DBSTAT_VTAB
+            cursor.execute('SELECT SUM(pgsize) FROM dbstat WHERE name = %s', [table])
+            size = cursor.fetchone()[0] or 0
+        except Exception:
+            size = None
+    return rows, size
+
+
+def seed(customers):
+    users = get_user_model().objects.bulk_create(
+        [get_user_model()(username=f'season-pass-{i}') for i in range(customers)])
+    recurring, expanded = [], []
+    for i, user in enumerate(users):
+        umbrella_id = utils.MIN_UMBRELLA_ID + i % (utils.MAX_UMBRELLA_ID - utils.MIN_UMBRELLA_ID + 1)
+        recurring.append(RecurringUmbrellaReservation(
+            customer=user, number_of_seats=utils.MIN_SEAT_UMBRELLA, reserved_umbrella_id=umbrella_id,
+            recurrence_start_date=SEASON_START, recurrence_end_date=SEASON_END, weekdays=recurrence.WEEKEND))
+        saturday = SEASON_START
+        while saturday < SEASON_END:
+            expanded.append(UmbrellaReservation(
+                customer=user, number_of_seats=utils.MIN_SEAT_UMBRELLA, reserved_umbrella_id=umbrella_id,
+                reservation_start_date=saturday, reservation_end_date=saturday + datetime.timedelta(days=1),
+                booked_days=2))  # bulk_create skips save(), which computes it
+            saturday += datetime.timedelta(days=7)
+    RecurringUmbrellaReservation.objects.bulk_create(recurring, batch_size=500)
+    UmbrellaReservation.objects.bulk_create(expanded, batch_size=500)
+
+
+def expanded_occupied_umbrella_ids(start_date, end_date):
+    return set(UmbrellaReservation.objects.filter(
+        reservation_start_date__lte=end_date, reservation_end_date__gte=start_date).values_list(
+        'reserved_umbrella_id', flat=True))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--customers', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        seed(args.customers)
+        print(f'{args.customers} weekend season passes from {SEASON_START} to {SEASON_END}')
+        for label, model in [('recurring', RecurringUmbrellaReservation), ('expanded', UmbrellaReservation)]:
+            rows, size = table_size(model)
+            print(f'  {label:<10} rows: {rows:>8}' + (f'  bytes: {size:>10}' if size is not None else ''))
+
+        ranges = [
+            ('weekday range', datetime.date(2023, 7, 3), datetime.date(2023, 7, 7)),
+            ('weekend range', datetime.date(2023, 7, 8), datetime.date(2023, 7, 9)),
+            ('whole season', SEASON_START, SEASON_END),
+        ]
+        # Both representations live side by side, so the recurring side only times the recurrence lookup
+        recurring_occupied_umbrella_ids = umbrella_ids_with_overlapping_recurrences
+        for label, start_date, end_date in ranges:
+            assert recurring_occupied_umbrella_ids(start_date, end_date) == \
+                   expanded_occupied_umbrella_ids(start_date, end_date)
+            recurring_time = min(timeit.repeat(lambda: recurring_occupied_umbrella_ids(start_date, end_date),
+                                               number=1, repeat=args.repeat))
+            expanded_time = min(timeit.repeat(lambda: expanded_occupied_umbrella_ids(start_date, end_date),
+                                              number=1, repeat=args.repeat))
+            print(f'  {label:<14} recurring: {recurring_time * 1000:8.2f} ms  '
+                  f'expanded: {expanded_time * 1000:8.2f} ms')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+if __name__ == '__main__':
+    main()
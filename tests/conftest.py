@@ -0,0 +1,19 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from mixer.backend.django import mixer
+from rest_framework.test import APIClient
+
+
+def get_client(user=None):
+    res = APIClient()
+    if user is not None:
+        res.force_login(user)
+    return res
+
+
+@pytest.fixture
+def manager(db):
+    user = mixer.blend(get_user_model())
+    user.groups.add(Group.objects.get_or_create(name='beach-managers')[0])
+    return user
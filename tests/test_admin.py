@@ -0,0 +1,69 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from mixer.backend.django import mixer
+
+from beachreservation import utils
+from beachreservation.admin import EstimatedCountPaginator, estimated_row_count, ESTIMATED_COUNT_THRESHOLD
+from beachreservation.models import UmbrellaReservation
+
+CHANGELIST = 'admin:beachreservation_umbrellareservation_changelist'
+
+
+def blend_reservations(count, **kwargs):
+    return [mixer.blend('beachreservation.UmbrellaReservation', number_of_seats=utils.MIN_SEAT_UMBRELLA,
+                        reserved_umbrella_id=utils.MIN_UMBRELLA_ID + i % utils.MAX_UMBRELLA_ID,
+                        reservation_start_date=datetime.date(2023, 7, 1) + datetime.timedelta(days=i),
+                        reservation_end_date=datetime.date(2023, 7, 1) + datetime.timedelta(days=i), **kwargs)
+            for i in range(count)]
+
+
+def changelist_queries(admin_client, params=None):
+    with CaptureQueriesContext(connection) as context:
+        response = admin_client.get(reverse(CHANGELIST), params or {})
+    assert response.status_code == 200
+    return context.captured_queries
+
+
+def test_changelist_queries_dont_grow_with_the_number_of_rows(admin_client):
+    blend_reservations(3)
+    few_rows_queries = len(changelist_queries(admin_client))
+    blend_reservations(30)
+    assert len(changelist_queries(admin_client)) == few_rows_queries
+
+
+def test_search_never_uses_like(admin_client):
+    user = mixer.blend(get_user_model(), username='beach-lover')
+    reservations = blend_reservations(2, customer=user)
+    blend_reservations(3)
+
+    for term in ['beach-lover', str(reservations[0].pk)]:
+        queries = changelist_queries(admin_client, {'q': term})
+        assert not any(' LIKE ' in query['sql'] for query in queries)
+
+    response = admin_client.get(reverse(CHANGELIST), {'q': 'beach-lover'})
+    assert set(response.context['cl'].result_list) == set(reservations)
+
+
+def test_umbrella_filter_narrows_down_the_changelist(admin_client):
+    reservations = blend_reservations(5)
+    response = admin_client.get(reverse(CHANGELIST), {'umbrella': reservations[2].reserved_umbrella_id})
+    assert list(response.context['cl'].result_list) == [reservations[2]]
+
+
+def test_estimated_count_comes_from_the_table_statistics(db):
+    assert estimated_row_count(UmbrellaReservation, 'default') is None
+
+    blend_reservations(3)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+        # Pretend the statistics have been gathered on a large table
+        cursor.execute("UPDATE sqlite_stat1 SET stat = %s WHERE tbl = %s",
+                       [f'{ESTIMATED_COUNT_THRESHOLD * 10} 1', UmbrellaReservation._meta.db_table])
+
+    assert EstimatedCountPaginator(UmbrellaReservation.objects.order_by('pk'), 100).count == ESTIMATED_COUNT_THRESHOLD * 10
+    # Filtered changelists are still counted exactly
+    assert EstimatedCountPaginator(UmbrellaReservation.objects.filter(reserved_umbrella_id=1).order_by('pk'), 100).count == 1
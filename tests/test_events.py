@@ -0,0 +1,129 @@
+import asyncio
+import datetime
+import gc
+import time
+import tracemalloc
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from mixer.backend.django import mixer
+from rest_framework.authtoken.models import Token
+
+from beachreservation import utils, recurrence
+from beachreservation.events import availability_broker, availability_stream, RESERVED
+from beachreservation.models import UmbrellaReservation
+
+STREAM_PATH = '/api/v1/beachreservation/freeumbrella/stream'
+
+
+class StreamClient:
+    """Drives the ASGI stream application as an ASGI server would, keeping every message sent back."""
+
+    def __init__(self, token=None, query_string=b'start_date=2023-07-01&end_date=2023-07-31'):
+        headers = [] if token is None else [(b'authorization', f'Token {token}'.encode())]
+        self.scope = {'type': 'http', 'method': 'GET', 'path': STREAM_PATH, 'headers': headers,
+                      'query_string': query_string}
+        self.messages = []
+        self.disconnect = asyncio.Event()
+
+    async def receive(self):
+        await self.disconnect.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        self.messages.append(message)
+
+    @property
+    def status(self):
+        return self.messages[0]['status']
+
+    @property
+    def body(self):
+        return b''.join(m.get('body', b'') for m in self.messages[1:])
+
+    def run(self):
+        return asyncio.ensure_future(availability_stream(self.scope, self.receive, self.send))
+
+
+async def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        await asyncio.sleep(0.01)
+
+
+def test_broker_delivers_only_to_subscribers_with_an_overlapping_range():
+    async def scenario():
+        july = availability_broker.subscribe(datetime.date(2023, 7, 1), datetime.date(2023, 7, 31))
+        august = availability_broker.subscribe(datetime.date(2023, 8, 1), datetime.date(2023, 8, 31))
+        # 2023-07-03 is a Monday
+        weekday_of_july = availability_broker.subscribe(datetime.date(2023, 7, 3), datetime.date(2023, 7, 3))
+        try:
+            availability_broker.publish(RESERVED, 1, datetime.date(2023, 7, 30), datetime.date(2023, 7, 30))
+            availability_broker.publish(RESERVED, 2, datetime.date(2023, 6, 1), datetime.date(2023, 9, 30),
+                                        weekdays=recurrence.WEEKEND)
+            await asyncio.sleep(0)
+            return july.queue.qsize(), august.queue.qsize(), weekday_of_july.queue.qsize()
+        finally:
+            for subscription in [july, august, weekday_of_july]:
+                availability_broker.unsubscribe(subscription)
+
+    assert asyncio.run(scenario()) == (2, 1, 0)
+
+
+def test_anon_user_cant_subscribe():
+    async def scenario():
+        client = StreamClient()
+        await client.run()
+        return client.status
+
+    assert asyncio.run(scenario()) == 403
+
+
+def test_subscription_without_date_parameters_gets_rejected(transactional_db):
+    token = Token.objects.create(user=mixer.blend(get_user_model()))
+
+    async def scenario():
+        client = StreamClient(token.key, query_string=b'')
+        await client.run()
+        return client.status
+
+    assert asyncio.run(scenario()) == 400
+
+
+def test_thousand_idle_subscribers_receive_a_reservation_change(transactional_db):
+    subscribers = 1000
+    token = Token.objects.create(user=mixer.blend(get_user_model()))
+
+    async def scenario():
+        gc.collect()
+        tracemalloc.start()
+        memory_before = tracemalloc.get_traced_memory()[0]
+
+        clients = [StreamClient(token.key) for _ in range(subscribers)]
+        tasks = [client.run() for client in clients]
+        await wait_until(lambda: availability_broker.subscriber_count == subscribers, timeout=30)
+
+        memory_per_subscriber = (tracemalloc.get_traced_memory()[0] - memory_before) / subscribers
+        tracemalloc.stop()
+
+        # Idle subscribers must not cost any CPU time
+        cpu_before = time.process_time()
+        await asyncio.sleep(1)
+        idle_cpu = time.process_time() - cpu_before
+
+        await sync_to_async(UmbrellaReservation.objects.create)(
+            customer=token.user, number_of_seats=utils.MIN_SEAT_UMBRELLA, reserved_umbrella_id=7,
+            reservation_start_date=datetime.date(2023, 7, 10), reservation_end_date=datetime.date(2023, 7, 12))
+        await wait_until(lambda: all(b'event: reserved' in client.body for client in clients))
+
+        for client in clients:
+            client.disconnect.set()
+        await asyncio.gather(*tasks)
+        return memory_per_subscriber, idle_cpu, availability_broker.subscriber_count, clients[0].body
+
+    memory_per_subscriber, idle_cpu, remaining_subscribers, body = asyncio.run(scenario())
+    assert memory_per_subscriber < 32 * 1024
+    assert idle_cpu < 0.25
+    assert remaining_subscribers == 0
+    assert b'"umbrella_id": 7' in body
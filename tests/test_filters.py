@@ -0,0 +1,108 @@
+import datetime
+import itertools
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from mixer.backend.django import mixer
+from rest_framework.request import Request
+from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST
+from rest_framework.test import APIRequestFactory
+
+from beachreservation.filters import ReservationSearchFilter
+from beachreservation.models import UmbrellaReservation
+from tests.conftest import get_client
+
+LIST_PATH = '/api/v1/beachreservation/'
+
+SUPPORTED_FILTERS = {
+    'start_date': '2023-07-01',
+    'end_date': '2023-07-31',
+    'umbrella_id': '1,2,3',
+    'customer': '1',
+    'seats': '2,3',
+    'min_price': '50',
+    'max_price': '150',
+}
+
+
+@pytest.fixture
+def july_reservations(db):
+    customer = mixer.blend(get_user_model())
+    return [
+        # 20 + 10 * 2 * 1 = 40
+        mixer.blend('beachreservation.UmbrellaReservation', customer=customer, number_of_seats=2,
+                    reserved_umbrella_id=1, reservation_start_date=datetime.date(2023, 7, 1),
+                    reservation_end_date=datetime.date(2023, 7, 1)),
+        # 20 + 10 * 3 * 3 = 110
+        mixer.blend('beachreservation.UmbrellaReservation', number_of_seats=3, reserved_umbrella_id=2,
+                    reservation_start_date=datetime.date(2023, 7, 10), reservation_end_date=datetime.date(2023, 7, 12)),
+        # 20 + 10 * 4 * 7 = 300
+        mixer.blend('beachreservation.UmbrellaReservation', number_of_seats=4, reserved_umbrella_id=3,
+                    reservation_start_date=datetime.date(2023, 7, 28), reservation_end_date=datetime.date(2023, 8, 3)),
+    ]
+
+
+def list_ids(client, params):
+    response = client.get(LIST_PATH, params)
+    assert response.status_code == HTTP_200_OK
+    return sorted(res['id'] for res in response.json())
+
+
+def test_filters_select_the_matching_reservations(manager, july_reservations):
+    manager_client = get_client(manager)
+    first, second, third = [res.id for res in july_reservations]
+    assert list_ids(manager_client, {'start_date': '2023-07-12', 'end_date': '2023-07-28'}) == [second, third]
+    assert list_ids(manager_client, {'start_date': '2023-08-01'}) == [third]
+    assert list_ids(manager_client, {'umbrella_id': '1,3'}) == [first, third]
+    assert list_ids(manager_client, {'customer': july_reservations[0].customer_id}) == [first]
+    assert list_ids(manager_client, {'seats': '3,4'}) == [second, third]
+    assert list_ids(manager_client, {'min_price': '40', 'max_price': '110'}) == [first, second]
+    assert list_ids(manager_client, {'min_price': '110.01'}) == [third]
+    assert list_ids(manager_client, {'max_price': '39.99'}) == []
+    assert list_ids(manager_client, {'seats': '4', 'max_price': '300', 'umbrella_id': '3'}) == [third]
+    assert list_ids(manager_client, {'umbrella_id': '3,999'}) == [third]
+    # Prices beyond any booked range are answered without overflowing the database integers
+    assert list_ids(manager_client, {'min_price': '1e30'}) == []
+    assert list_ids(manager_client, {'max_price': '1e30'}) == [first, second, third]
+    assert list_ids(manager_client, {'min_price': '-1e999999', 'max_price': '1e999999'}) == [first, second, third]
+    assert list_ids(manager_client, {'max_price': '-1e30'}) == []
+
+
+def test_filters_dont_widen_the_customer_scope(july_reservations):
+    client = get_client(july_reservations[1].customer)
+    assert list_ids(client, {'customer': july_reservations[0].customer_id}) == []
+
+
+@pytest.mark.parametrize('params', [
+    {'start_date': '12-07-2023'}, {'umbrella_id': 'a,b'}, {'customer': '1,2'}, {'min_price': 'cheap'},
+    {'umbrella_id': '99999999999999999999'}, {'customer': '99999999999999999999'}, {'seats': '99999999999999999999'},
+])
+def test_malformed_filters_are_rejected(manager, params):
+    assert get_client(manager).get(LIST_PATH, params).status_code == HTTP_400_BAD_REQUEST
+
+
+def filter_combinations():
+    names = list(SUPPORTED_FILTERS)
+    for size in range(1, len(names) + 1):
+        yield from itertools.combinations(names, size)
+
+
+@pytest.mark.parametrize('scoped_to_customer', [False, True])
+def test_no_supported_filter_combination_scans_the_whole_table(db, scoped_to_customer):
+    base_queryset = UmbrellaReservation.objects.all()
+    if scoped_to_customer:
+        base_queryset = base_queryset.filter(customer=mixer.blend(get_user_model()))
+
+    table = UmbrellaReservation._meta.db_table
+    full_scans = []
+    for combination in filter_combinations():
+        request = Request(APIRequestFactory().get(LIST_PATH, {name: SUPPORTED_FILTERS[name] for name in combination}))
+        queryset = ReservationSearchFilter().filter_queryset(request, base_queryset, None)
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = [row[-1] for row in cursor.fetchall()]
+        if any(step.startswith(f'SCAN {table}') for step in plan):
+            full_scans.append((combination, plan))
+    assert full_scans == []
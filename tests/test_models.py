@@ -1,10 +1,13 @@
 import datetime
+import decimal
 
 import pytest
 from django.core.exceptions import ValidationError
 from mixer.backend.django import mixer
 from dateutil.relativedelta import relativedelta
-from beachreservation import utils
+from django.utils import timezone
+from beachreservation import utils, recurrence, pricing
+from beachreservation.models import UmbrellaHold
 
 
 def test_cant_book_for_overlapped_reservations(db):
@@ -59,6 +62,16 @@ def test_price_calculation_in_umbrella_reservation(db):
         assert res.reservation_price == corresponding_correct_price[idx]
 
 
+def test_reservation_price_matches_quote_and_leaves_decimal_context_alone(db):
+    start_date = datetime.date(2023, 1, 1)
+    end_date = start_date + relativedelta(days=2500)
+    res = mixer.blend('beachreservation.UmbrellaReservation', number_of_seats=utils.MAX_SEAT_UMBRELLA,
+                      reservation_start_date=start_date, reservation_end_date=end_date)
+    precision = decimal.getcontext().prec
+    assert [res.reservation_price] == pricing.quote_prices([(utils.MAX_SEAT_UMBRELLA, start_date, end_date)])
+    assert decimal.getcontext().prec == precision
+
+
 def test_invalid_reservation_values(db):
     today_date = datetime.date.today()
     invalid_reservations = [
@@ -125,3 +138,116 @@ def test_valid_model_values(db):
     ]
     for value in valid_values:
         value.full_clean()
+
+
+def test_weekday_mask_for_range_wraps_around_the_week():
+    # 2022-12-24 is a Saturday
+    saturday = datetime.date(2022, 12, 24)
+    assert recurrence.weekday_mask_for_range(saturday, saturday) == recurrence.SATURDAY
+    assert recurrence.weekday_mask_for_range(saturday, saturday + relativedelta(days=2)) == \
+           recurrence.WEEKEND | recurrence.MONDAY
+    assert recurrence.weekday_mask_for_range(saturday, saturday + relativedelta(days=6)) == recurrence.ALL_WEEKDAYS
+    assert recurrence.weekday_mask_for_range(saturday, saturday - relativedelta(days=1)) == 0
+
+
+def test_count_occurrences_matches_expanded_days():
+    start_date = datetime.date(2023, 6, 1)
+    for weekdays in [recurrence.WEEKEND, recurrence.MONDAY | recurrence.THURSDAY, recurrence.ALL_WEEKDAYS]:
+        for length in range(0, 40):
+            end_date = start_date + relativedelta(days=length)
+            expanded = [start_date + relativedelta(days=i) for i in range(length + 1)]
+            expected = len([day for day in expanded if weekdays & (1 << day.weekday())])
+            assert recurrence.count_occurrences(start_date, end_date, weekdays) == expected
+
+
+def test_recurring_reservation_price_leaves_decimal_context_alone(db):
+    res = mixer.blend('beachreservation.RecurringUmbrellaReservation', number_of_seats=utils.MAX_SEAT_UMBRELLA,
+                      weekdays=recurrence.ALL_WEEKDAYS, recurrence_start_date=datetime.date(2023, 1, 1),
+                      recurrence_end_date=datetime.date(2029, 11, 5))
+    precision = decimal.getcontext().prec
+    assert res.reservation_price == pricing.reservation_price(utils.MAX_SEAT_UMBRELLA, res.booked_days)
+    assert decimal.getcontext().prec == precision
+
+
+def test_recurring_reservation_price_counts_only_booked_weekdays(db):
+    # Every weekend of June 2023: 4 Saturdays and 4 Sundays
+    res = mixer.blend('beachreservation.RecurringUmbrellaReservation', number_of_seats=utils.MIN_SEAT_UMBRELLA,
+                      reserved_umbrella_id=1, weekdays=recurrence.WEEKEND,
+                      recurrence_start_date=datetime.date(2023, 6, 1),
+                      recurrence_end_date=datetime.date(2023, 6, 30))
+    assert res.booked_days == 8
+    assert res.reservation_price == 180
+
+
+def test_recurring_reservation_blocks_only_its_weekdays(db):
+    mixer.blend('beachreservation.RecurringUmbrellaReservation', number_of_seats=utils.MIN_SEAT_UMBRELLA,
+                reserved_umbrella_id=1, weekdays=recurrence.WEEKEND,
+                recurrence_start_date=datetime.date(2023, 6, 1), recurrence_end_date=datetime.date(2023, 9, 30))
+    # Monday to Friday of a week in July
+    weekdays_reservation = mixer.blend('beachreservation.UmbrellaReservation', number_of_seats=utils.MIN_SEAT_UMBRELLA,
+                                       reserved_umbrella_id=1, reservation_start_date=datetime.date(2023, 7, 3),
+                                       reservation_end_date=datetime.date(2023, 7, 7))
+    weekdays_reservation.full_clean()
+
+    # Friday to Saturday of the same week
+    weekend_reservation = mixer.blend('beachreservation.UmbrellaReservation', number_of_seats=utils.MIN_SEAT_UMBRELLA,
+                                      reserved_umbrella_id=1, reservation_start_date=datetime.date(2023, 7, 7),
+                                      reservation_end_date=datetime.date(2023, 7, 8))
+    with pytest.raises(ValidationError):
+        weekend_reservation.full_clean()
+
+
+def test_cant_book_overlapping_recurring_reservations(db):
+    mixer.blend('beachreservation.RecurringUmbrellaReservation', number_of_seats=utils.MIN_SEAT_UMBRELLA,
+                reserved_umbrella_id=1, weekdays=recurrence.SATURDAY,
+                recurrence_start_date=datetime.date(2023, 6, 1), recurrence_end_date=datetime.date(2023, 9, 30))
+    sundays = mixer.blend('beachreservation.RecurringUmbrellaReservation', number_of_seats=utils.MIN_SEAT_UMBRELLA,
+                          reserved_umbrella_id=1, weekdays=recurrence.SUNDAY,
+                          recurrence_start_date=datetime.date(2023, 6, 1),
+                          recurrence_end_date=datetime.date(2023, 9, 30))
+    sundays.full_clean()
+    weekends = mixer.blend('beachreservation.RecurringUmbrellaReservation', number_of_seats=utils.MIN_SEAT_UMBRELLA,
+                           reserved_umbrella_id=1, weekdays=recurrence.WEEKEND,
+                           recurrence_start_date=datetime.date(2023, 9, 1),
+                           recurrence_end_date=datetime.date(2023, 10, 31))
+    with pytest.raises(ValidationError):
+        weekends.full_clean()
+
+
+def test_recurring_reservation_without_occurrences_is_invalid(db):
+    # Monday to Friday but only Sundays are booked
+    res = mixer.blend('beachreservation.RecurringUmbrellaReservation', number_of_seats=utils.MIN_SEAT_UMBRELLA,
+                      reserved_umbrella_id=1, weekdays=recurrence.SUNDAY,
+                      recurrence_start_date=datetime.date(2023, 7, 3), recurrence_end_date=datetime.date(2023, 7, 7))
+    with pytest.raises(ValidationError):
+        res.full_clean()
+
+
+def test_active_holds_occupy_their_umbrella(db):
+    mixer.blend('beachreservation.UmbrellaHold', reserved_umbrella_id=1, number_of_seats=utils.MIN_SEAT_UMBRELLA,
+                reservation_start_date=datetime.date(2022, 12, 20), reservation_end_date=datetime.date(2022, 12, 25),
+                expires_at=timezone.now() + relativedelta(minutes=5))
+    mixer.blend('beachreservation.UmbrellaHold', reserved_umbrella_id=2, number_of_seats=utils.MIN_SEAT_UMBRELLA,
+                reservation_start_date=datetime.date(2022, 12, 20), reservation_end_date=datetime.date(2022, 12, 25),
+                expires_at=timezone.now() - relativedelta(minutes=1))
+    with pytest.raises(ValidationError):
+        mixer.blend('beachreservation.UmbrellaReservation', number_of_seats=utils.MIN_SEAT_UMBRELLA,
+                    reserved_umbrella_id=1, reservation_start_date=datetime.date(2022, 12, 24),
+                    reservation_end_date=datetime.date(2022, 12, 28)).full_clean()
+    with pytest.raises(ValidationError):
+        mixer.blend('beachreservation.UmbrellaHold', number_of_seats=utils.MIN_SEAT_UMBRELLA,
+                    reserved_umbrella_id=1, reservation_start_date=datetime.date(2022, 12, 24),
+                    reservation_end_date=datetime.date(2022, 12, 28)).full_clean()
+    # The expired hold doesn't count anymore
+    mixer.blend('beachreservation.UmbrellaReservation', number_of_seats=utils.MIN_SEAT_UMBRELLA,
+                reserved_umbrella_id=2, reservation_start_date=datetime.date(2022, 12, 24),
+                reservation_end_date=datetime.date(2022, 12, 28)).full_clean()
+
+
+def test_purge_expired_deletes_only_expired_holds_in_batches(db):
+    for minutes in (-3, -2, -1, 5):
+        mixer.blend('beachreservation.UmbrellaHold', expires_at=timezone.now() + relativedelta(minutes=minutes))
+    assert UmbrellaHold.objects.purge_expired(batch_size=2) == 2
+    assert UmbrellaHold.objects.purge_expired(batch_size=2) == 1
+    assert UmbrellaHold.objects.purge_expired(batch_size=2) == 0
+    assert UmbrellaHold.objects.count() == UmbrellaHold.objects.active().count() == 1
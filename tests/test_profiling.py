@@ -0,0 +1,100 @@
+import datetime
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from mixer.backend.django import mixer
+from rest_framework.authtoken.models import Token
+from rest_framework.status import HTTP_200_OK, HTTP_403_FORBIDDEN, HTTP_404_NOT_FOUND
+
+from beachreservation import profiling
+from tests.conftest import get_client
+
+RESERVATIONS_PATH = '/api/v1/beachreservation/'
+PROFILES_PATH = '/api/v1/beachreservation/profiles'
+
+
+@pytest.fixture(autouse=True)
+def profiles_dir(tmp_path):
+    cache.clear()
+    with override_settings(BEACHRESERVATION_PROFILES_DIR=tmp_path):
+        yield tmp_path
+    cache.clear()
+
+
+def test_unflagged_requests_arent_profiled(manager, profiles_dir):
+    response = get_client(manager).get(RESERVATIONS_PATH)
+    assert response.status_code == HTTP_200_OK
+    assert profiling.PROFILE_ID_HEADER not in response
+    assert not list(profiles_dir.iterdir())
+
+
+def test_customers_requests_arent_profiled(db, profiles_dir):
+    response = get_client(mixer.blend(get_user_model())).get(RESERVATIONS_PATH, HTTP_X_PROFILE='1')
+    assert response.status_code == HTTP_200_OK
+    assert profiling.PROFILE_ID_HEADER not in response
+    assert not list(profiles_dir.iterdir())
+
+
+def test_manager_request_is_profiled_with_its_queries_by_phase(manager):
+    mixer.cycle(3).blend('beachreservation.UmbrellaReservation', reservation_start_date=datetime.date.today(),
+                         reservation_end_date=datetime.date.today())
+    client = get_client(manager)
+    response = client.get(RESERVATIONS_PATH, {'profile': '1'})
+    assert response.status_code == HTTP_200_OK
+    assert len(response.json()) == 3
+
+    summary = client.get(f'{PROFILES_PATH}/{response[profiling.PROFILE_ID_HEADER]}').json()
+    assert summary['path'] == f'{RESERVATIONS_PATH}?profile=1'
+    assert summary['status_code'] == HTTP_200_OK
+    assert set(summary['phases']) == set(profiling.PHASES)
+    assert summary['phases'][profiling.RENDERING]['duration_ms'] > 0
+    # The group lookup of get_queryset and the reservations read while serializing
+    assert summary['phases'][profiling.GET_QUERYSET]['queries'] >= 1
+    assert summary['phases'][profiling.SERIALIZATION]['queries'] >= 1
+    assert summary['query_count'] == len(summary['queries'])
+    assert summary['top_functions']
+
+    dump = client.get(f'{PROFILES_PATH}/{summary["id"]}/pstats')
+    assert dump.status_code == HTTP_200_OK
+    assert b''.join(dump.streaming_content)
+    assert [profile['id'] for profile in client.get(PROFILES_PATH).json()] == [summary['id']]
+
+
+def test_token_authenticated_managers_can_be_profiled(manager):
+    client = get_client()
+    # The keyword is case insensitive, as for TokenAuthentication
+    client.credentials(HTTP_AUTHORIZATION=f'token {Token.objects.create(user=manager).key}')
+    response = client.get(RESERVATIONS_PATH, HTTP_X_PROFILE='1')
+    assert profiling.PROFILE_ID_HEADER in response
+    summary = get_client(manager).get(f'{PROFILES_PATH}/{response[profiling.PROFILE_ID_HEADER]}').json()
+    assert summary['phases'][profiling.AUTHENTICATION]['queries'] >= 1
+
+
+@override_settings(BEACHRESERVATION_PROFILES_PER_MINUTE=2)
+def test_profiles_are_rate_limited(manager):
+    client = get_client(manager)
+    responses = [client.get(RESERVATIONS_PATH, HTTP_X_PROFILE='1') for _ in range(3)]
+    assert [profiling.PROFILE_ID_HEADER in response for response in responses] == [True, True, False]
+    assert responses[2]['X-Profile-Skipped'] == 'rate-limited'
+    # The rate limited request didn't keep the process busy
+    assert profiling._profiling_lock.acquire(blocking=False)
+    profiling._profiling_lock.release()
+
+
+@override_settings(BEACHRESERVATION_PROFILES_KEPT=2)
+def test_only_the_newest_profiles_are_kept(manager, profiles_dir):
+    client = get_client(manager)
+    for _ in range(3):
+        client.get(RESERVATIONS_PATH, HTTP_X_PROFILE='1')
+    assert len(list(profiles_dir.glob('*.json'))) == len(list(profiles_dir.glob('*.prof'))) == 2
+
+
+def test_only_managers_can_read_the_profiles(manager):
+    profile_id = get_client(manager).get(RESERVATIONS_PATH, HTTP_X_PROFILE='1')[profiling.PROFILE_ID_HEADER]
+    customer = get_client(mixer.blend(get_user_model()))
+    assert customer.get(PROFILES_PATH).status_code == HTTP_403_FORBIDDEN
+    assert customer.get(f'{PROFILES_PATH}/{profile_id}').status_code == HTTP_403_FORBIDDEN
+    assert get_client(manager).get(f'{PROFILES_PATH}/../settings').status_code == HTTP_404_NOT_FOUND
+    assert get_client(manager).get(f'{PROFILES_PATH}/{"0" * 32}').status_code == HTTP_404_NOT_FOUND
@@ -0,0 +1,102 @@
+import datetime
+
+import pytest
+from dateutil.relativedelta import relativedelta
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import override_settings
+from mixer.backend.django import mixer
+from rest_framework.status import HTTP_201_CREATED, HTTP_400_BAD_REQUEST
+
+from beachreservation import utils
+from beachreservation.models import UmbrellaReservation
+from tests.conftest import get_client
+
+pytestmark = pytest.mark.django_db(databases=['default', 'replica'], transaction=True)
+
+LIST_PATH = '/api/v1/beachreservation/'
+
+
+@pytest.fixture(autouse=True)
+def replica():
+    cache.clear()
+    with override_settings(BEACHRESERVATION_READ_REPLICA='replica'):
+        yield
+    cache.clear()
+
+
+def sync_replica():
+    """Copy the primary over the replica file, standing in for the replication."""
+    for alias in ['default', 'replica']:
+        connections[alias].ensure_connection()
+    connections['default'].connection.backup(connections['replica'].connection)
+
+
+def blend_reservation(**kwargs):
+    return mixer.blend('beachreservation.UmbrellaReservation', number_of_seats=utils.MIN_SEAT_UMBRELLA,
+                       reserved_umbrella_id=1, reservation_start_date=datetime.date.today(),
+                       reservation_end_date=datetime.date.today(), **kwargs)
+
+
+def test_list_reads_from_the_replica(manager):
+    client = get_client(manager)
+    sync_replica()
+
+    blend_reservation()
+    assert client.get(LIST_PATH).json() == []
+
+    sync_replica()
+    assert len(client.get(LIST_PATH).json()) == 1
+
+
+def test_free_umbrella_reads_from_the_replica():
+    user = mixer.blend(get_user_model())
+    client = get_client(user)
+    today = datetime.date.today()
+    path = f"/api/v1/beachreservation/freeumbrella?start_date={today}&end_date={today}"
+    sync_replica()
+
+    blend_reservation()
+    assert 1 in client.get(path).json()
+
+    sync_replica()
+    assert 1 not in client.get(path).json()
+
+
+def test_users_read_their_own_writes_from_the_primary(manager):
+    user = mixer.blend(get_user_model())
+    client = get_client(user)
+    other_manager = get_client(manager)
+    sync_replica()
+
+    reservation = {'number_of_seats': 2, 'reservation_start_date': datetime.date.today(),
+                   'reservation_end_date': datetime.date.today() + relativedelta(days=1), 'reserved_umbrella_id': 10}
+    assert client.post(LIST_PATH, reservation).status_code == HTTP_201_CREATED
+
+    assert len(client.get(LIST_PATH).json()) == 1
+    # Everybody else waits for the replication
+    assert other_manager.get(LIST_PATH).json() == []
+
+    cache.clear()
+    assert client.get(LIST_PATH).json() == []
+
+
+def test_writes_validate_against_the_primary():
+    user = mixer.blend(get_user_model())
+    client = get_client(user)
+    sync_replica()
+
+    blend_reservation()
+    reservation = {'number_of_seats': 2, 'reservation_start_date': datetime.date.today(),
+                   'reservation_end_date': datetime.date.today(), 'reserved_umbrella_id': 1}
+    assert client.post(LIST_PATH, reservation).status_code == HTTP_400_BAD_REQUEST
+    assert UmbrellaReservation.objects.count() == 1
+
+
+def test_reads_stay_on_the_primary_without_a_replica(manager):
+    client = get_client(manager)
+    sync_replica()
+    blend_reservation()
+    with override_settings(BEACHRESERVATION_READ_REPLICA=None):
+        assert len(client.get(LIST_PATH).json()) == 1
@@ -0,0 +1,63 @@
+import gzip
+
+import pytest
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework.status import HTTP_200_OK, HTTP_304_NOT_MODIFIED, HTTP_403_FORBIDDEN
+
+from BeachResortReservation import schema
+
+
+@pytest.fixture(autouse=True)
+def fresh_artifacts():
+    schema.reset_schema_artifacts()
+    yield
+    schema.reset_schema_artifacts()
+
+
+def test_anon_user_cant_read_the_docs(client):
+    assert client.get('/docs/').status_code == HTTP_403_FORBIDDEN
+
+
+def test_docs_are_served_gzipped_with_caching_headers(admin_client):
+    response = admin_client.get('/docs/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+    assert response.status_code == HTTP_200_OK
+    assert response['Content-Encoding'] == 'gzip'
+    assert 'max-age=86400' in response['Cache-Control']
+    assert b'Beach Resort Reservation' in gzip.decompress(response.content)
+
+    not_modified = admin_client.get('/docs/', HTTP_IF_NONE_MATCH=response['ETag'])
+    assert not_modified.status_code == HTTP_304_NOT_MODIFIED
+
+
+def test_schema_is_decompressed_for_clients_not_accepting_gzip(admin_client):
+    response = admin_client.get('/schema/')
+    assert response.status_code == HTTP_200_OK
+    assert not response.has_header('Content-Encoding')
+    assert b'beachreservation' in response.content
+
+
+def test_each_encoding_has_its_own_etag(admin_client):
+    gzipped = admin_client.get('/schema/', HTTP_ACCEPT_ENCODING='gzip')
+    identity = admin_client.get('/schema/')
+    assert gzipped['ETag'] != identity['ETag']
+    assert gzipped['ETag'] == identity['ETag'][:-1] + '-gzip"'
+    # A cached copy in either encoding is still valid
+    for etag in (gzipped['ETag'], identity['ETag']):
+        assert admin_client.get('/schema/', HTTP_IF_NONE_MATCH=etag).status_code == HTTP_304_NOT_MODIFIED
+
+
+def test_shared_docs_page_doesnt_name_a_user(admin_client):
+    response = admin_client.get('/docs/')
+    assert response.status_code == HTTP_200_OK
+    assert b'logged in as .' not in response.content
+    assert b'You are logged in.' in response.content
+
+
+def test_views_serve_the_built_artifacts(admin_client, tmp_path):
+    call_command('build_api_schema', output_dir=tmp_path)
+    artifact = (tmp_path / 'schema.js.gz').read_bytes()
+
+    with override_settings(API_SCHEMA_ARTIFACTS_DIR=tmp_path):
+        response = admin_client.get('/docs/schema.js', HTTP_ACCEPT_ENCODING='gzip')
+    assert response.content == artifact
@@ -5,13 +5,17 @@ import pytest
 from dateutil.relativedelta import relativedelta
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
+from django.core.management import call_command
 from django.urls import reverse
+from django.utils import timezone
 from mixer.backend.django import mixer
 from rest_framework.status import HTTP_403_FORBIDDEN, HTTP_200_OK, HTTP_201_CREATED, HTTP_404_NOT_FOUND, \
-    HTTP_204_NO_CONTENT, HTTP_400_BAD_REQUEST
-from rest_framework.test import APIClient
+    HTTP_204_NO_CONTENT, HTTP_400_BAD_REQUEST, HTTP_410_GONE
 
-from beachreservation import utils
+from beachreservation import utils, recurrence
+from beachreservation.models import ReservationChange, UmbrellaHold, UmbrellaReservation
+from beachreservation.views import UmbrellaReservationQuote
+from tests.conftest import get_client
 
 
 @pytest.fixture
@@ -31,13 +35,6 @@ def reservations(db):
     ]
 
 
-def get_client(user=None):
-    res = APIClient()
-    if user is not None:
-        res.force_login(user)
-    return res
-
-
 def parse(response):
     response.render()
     content = response.content.decode()
@@ -214,3 +211,269 @@ class TestFreeUmbrellaInADateRange:
         received_umbrella_id = parse(response)
         assert response.status_code == HTTP_200_OK
         assert expected_free_umbrella_id == received_umbrella_id
+
+    def test_recurring_reservations_are_not_returned_on_their_free_weekdays(self, db):
+        mixer.blend('beachreservation.RecurringUmbrellaReservation', number_of_seats=utils.MIN_SEAT_UMBRELLA,
+                    reserved_umbrella_id=4, weekdays=recurrence.WEEKEND,
+                    recurrence_start_date=datetime.date(2023, 6, 1), recurrence_end_date=datetime.date(2023, 9, 30))
+        user = mixer.blend(get_user_model())
+        client = get_client(user)
+
+        # Monday to Friday
+        response = client.get("/api/v1/beachreservation/freeumbrella?start_date=2023-07-03&end_date=2023-07-07")
+        assert 4 in parse(response)
+
+        # Friday to Saturday
+        response = client.get("/api/v1/beachreservation/freeumbrella?start_date=2023-07-07&end_date=2023-07-08")
+        assert 4 not in parse(response)
+
+        # Range crossing the end of the recurrence, the only weekend day in common is Saturday 30th
+        response = client.get("/api/v1/beachreservation/freeumbrella?start_date=2023-09-29&end_date=2023-10-02")
+        assert 4 not in parse(response)
+
+        # Range starting after the last occurrence
+        response = client.get("/api/v1/beachreservation/freeumbrella?start_date=2023-10-01&end_date=2023-10-02")
+        assert 4 in parse(response)
+
+
+class TestRecurringUmbrellaReservationsListCreateDestroyViewSet:
+    def test_anon_user_cant_make_get_requests(self, db):
+        path = reverse('recurring-reservations-list')
+        client = get_client()
+        response = client.get(path)
+        assert response.status_code == HTTP_403_FORBIDDEN
+
+    def test_customer_user_can_create_and_list_own_recurring_reservations(self, db):
+        path = reverse('recurring-reservations-list')
+        mixer.blend('beachreservation.RecurringUmbrellaReservation', number_of_seats=utils.MIN_SEAT_UMBRELLA,
+                    reserved_umbrella_id=1, weekdays=recurrence.WEEKEND,
+                    recurrence_start_date=datetime.date.today(),
+                    recurrence_end_date=datetime.date.today() + relativedelta(days=30))
+        user = mixer.blend(get_user_model())
+        client = get_client(user)
+        reservation = {'number_of_seats': 2, 'recurrence_start_date': datetime.date.today(),
+                       'recurrence_end_date': datetime.date.today() + relativedelta(days=30),
+                       'weekdays': recurrence.WEEKEND, 'reserved_umbrella_id': 10}
+        response = client.post(path, reservation)
+        assert response.status_code == HTTP_201_CREATED
+
+        parsed_res = parse(client.get(path))
+        assert len(parsed_res) == 1
+        assert parsed_res[0]['customer'] == user.id
+
+    def test_recurring_reservation_overlapping_a_reservation_is_rejected(self, db):
+        path = reverse('recurring-reservations-list')
+        mixer.blend('beachreservation.UmbrellaReservation', number_of_seats=utils.MIN_SEAT_UMBRELLA,
+                    reserved_umbrella_id=10, reservation_start_date=datetime.date.today(),
+                    reservation_end_date=datetime.date.today() + relativedelta(days=6))
+        user = mixer.blend(get_user_model())
+        client = get_client(user)
+        reservation = {'number_of_seats': 2, 'recurrence_start_date': datetime.date.today(),
+                       'recurrence_end_date': datetime.date.today() + relativedelta(days=30),
+                       'weekdays': recurrence.WEEKEND, 'reserved_umbrella_id': 10}
+        response = client.post(path, reservation)
+        assert response.status_code == HTTP_400_BAD_REQUEST
+
+    def test_customer_user_cant_delete_not_owned_recurring_reservations(self, db):
+        reservation = mixer.blend('beachreservation.RecurringUmbrellaReservation',
+                                  number_of_seats=utils.MIN_SEAT_UMBRELLA, reserved_umbrella_id=1,
+                                  weekdays=recurrence.WEEKEND, recurrence_start_date=datetime.date.today(),
+                                  recurrence_end_date=datetime.date.today() + relativedelta(days=30))
+        path = reverse("recurring-reservations-detail", kwargs={'pk': reservation.pk})
+        user = mixer.blend(get_user_model())
+        client = get_client(user)
+        response = client.delete(path)
+        assert response.status_code == HTTP_404_NOT_FOUND
+
+
+class TestUmbrellaReservationQuote:
+    path = "/api/v1/beachreservation/quote"
+
+    @staticmethod
+    def candidate(umbrella_id, seats, start_date, end_date):
+        return {'reserved_umbrella_id': umbrella_id, 'number_of_seats': seats,
+                'reservation_start_date': str(start_date), 'reservation_end_date': str(end_date)}
+
+    def test_anon_user_cant_make_request(self, db):
+        response = get_client().post(self.path, [], format='json')
+        assert response.status_code == HTTP_403_FORBIDDEN
+
+    def test_quotes_prices_and_availability_of_every_candidate(self, reservations):
+        mixer.blend('beachreservation.RecurringUmbrellaReservation', number_of_seats=utils.MIN_SEAT_UMBRELLA,
+                    reserved_umbrella_id=5, weekdays=recurrence.WEEKEND,
+                    recurrence_start_date=datetime.date(2023, 6, 1), recurrence_end_date=datetime.date(2023, 9, 30))
+        today = datetime.date.today()
+        candidates = [
+            # Umbrella 3 is booked from today for 4 days
+            self.candidate(3, 2, today + relativedelta(days=3), today + relativedelta(days=5)),
+            self.candidate(3, 4, today + relativedelta(days=4), today + relativedelta(days=5)),
+            self.candidate(10, 3, today, today + relativedelta(days=2)),
+            # Umbrella 5 is booked every weekend, 2023-07-07 is a Friday
+            self.candidate(5, 2, datetime.date(2023, 7, 3), datetime.date(2023, 7, 7)),
+            self.candidate(5, 2, datetime.date(2023, 7, 7), datetime.date(2023, 7, 8)),
+        ]
+        client = get_client(mixer.blend(get_user_model()))
+        response = client.post(self.path, candidates, format='json')
+        assert response.status_code == HTTP_200_OK
+
+        quotes = parse(response)
+        assert [quote['available'] for quote in quotes] == [False, True, True, True, False]
+        assert [quote['reservation_price'] for quote in quotes] == [80, 100, 110, 120, 60]
+        assert [quote['reserved_umbrella_id'] for quote in quotes] == [3, 3, 10, 5, 5]
+
+    def test_number_of_queries_doesnt_depend_on_the_batch_size(self, reservations, django_assert_max_num_queries):
+        today = datetime.date.today()
+        candidates = [self.candidate(umbrella_id, seats, today + relativedelta(days=offset),
+                                     today + relativedelta(days=offset + 2))
+                      for umbrella_id in range(utils.MIN_UMBRELLA_ID, utils.MAX_UMBRELLA_ID + 1)
+                      for seats in range(utils.MIN_SEAT_UMBRELLA, utils.MAX_SEAT_UMBRELLA + 1)
+                      for offset in range(4)][:UmbrellaReservationQuote.max_candidates]
+        assert len(candidates) == UmbrellaReservationQuote.max_candidates
+        client = get_client(mixer.blend(get_user_model()))
+        # Session and user lookups, then one query for the reservations and one for the recurrences
+        with django_assert_max_num_queries(4):
+            response = client.post(self.path, candidates, format='json')
+        assert response.status_code == HTTP_200_OK
+        assert len(parse(response)) == len(candidates)
+
+        too_many = candidates + candidates[:1]
+        assert client.post(self.path, too_many, format='json').status_code == HTTP_400_BAD_REQUEST
+
+    def test_invalid_candidates_are_rejected(self, db):
+        today = datetime.date.today()
+        client = get_client(mixer.blend(get_user_model()))
+        invalid_batches = [
+            {'not': 'a list'},
+            [self.candidate(utils.MAX_UMBRELLA_ID + 1, 2, today, today)],
+            [self.candidate(1, utils.MAX_SEAT_UMBRELLA + 1, today, today)],
+            [self.candidate(1, 2, today + relativedelta(days=1), today)],
+        ]
+        for batch in invalid_batches:
+            assert client.post(self.path, batch, format='json').status_code == HTTP_400_BAD_REQUEST
+
+
+class TestReservationChanges:
+    path = "/api/v1/beachreservation/changes/"
+
+    def test_anon_user_cant_make_request(self, db):
+        response = get_client().get(self.path)
+        assert response.status_code == HTTP_403_FORBIDDEN
+
+    def test_customer_gets_only_own_changes(self, reservations):
+        client = get_client(reservations[0].customer)
+        response = client.get(self.path)
+        assert response.status_code == HTTP_200_OK
+        changes = parse(response)
+        assert [(c['kind'], c['reservation_id']) for c in changes['changes']] == [('created', reservations[0].id)]
+        assert not changes['has_more']
+
+    def test_changes_after_since_are_returned_in_order(self, reservations, manager):
+        client = get_client(manager)
+        last_seq = parse(client.get(self.path))['last_seq']
+
+        assert client.delete(reverse('reservations-detail', kwargs={'pk': reservations[1].pk})).status_code == \
+               HTTP_204_NO_CONTENT
+        reservation = {'number_of_seats': 3, 'reservation_start_date': datetime.date.today(),
+                       'reservation_end_date': datetime.date.today(), 'reserved_umbrella_id': 14}
+        assert client.post(reverse('reservations-list'), reservation).status_code == HTTP_201_CREATED
+
+        changes = parse(client.get(self.path, {'since': last_seq}))
+        assert [(c['kind'], c['reserved_umbrella_id']) for c in changes['changes']] == \
+               [('cancelled', 2), ('created', 14)]
+        assert changes['last_seq'] > last_seq
+        assert parse(client.get(self.path, {'since': changes['last_seq']}))['changes'] == []
+
+    def test_reservations_deleted_with_their_customer_are_cancelled(self, reservations, manager):
+        client = get_client(manager)
+        last_seq = parse(client.get(self.path))['last_seq']
+
+        reservations[1].customer.delete()
+
+        changes = parse(client.get(self.path, {'since': last_seq}))['changes']
+        assert [(c['kind'], c['reservation_id']) for c in changes] == [('cancelled', reservations[1].id)]
+        # The earlier entries of the deleted customer are kept
+        assert ReservationChange.objects.filter(reservation_id=reservations[1].id).count() == 2
+
+    def test_invalid_since_is_rejected(self, db):
+        client = get_client(mixer.blend(get_user_model()))
+        assert client.get(self.path, {'since': 'yesterday'}).status_code == HTTP_400_BAD_REQUEST
+
+    def test_compacted_changes_are_gone(self, reservations):
+        ReservationChange.objects.update(created_at=timezone.now() - relativedelta(days=60))
+        call_command('compact_reservation_changes', '--days', '30')
+        # The newest entry is kept
+        assert ReservationChange.objects.count() == 1
+
+        client = get_client(reservations[2].customer)
+        response = client.get(self.path, {'since': 0})
+        assert response.status_code == HTTP_410_GONE
+        assert parse(response)['latest_seq'] == ReservationChange.objects.get().seq
+        assert parse(client.get(self.path, {'since': parse(response)['latest_seq']}))['changes'] == []
+
+
+class TestUmbrellaHolds:
+    @staticmethod
+    def hold(umbrella_id, start_date=None, end_date=None):
+        return {'number_of_seats': 3, 'reserved_umbrella_id': umbrella_id,
+                'reservation_start_date': start_date or datetime.date.today(),
+                'reservation_end_date': end_date or datetime.date.today() + relativedelta(days=1)}
+
+    def test_anon_user_cant_hold(self, db):
+        response = get_client().post(reverse('holds-list'), self.hold(10))
+        assert response.status_code == HTTP_403_FORBIDDEN
+
+    def test_held_umbrella_is_occupied_for_everyone(self, db):
+        customer = get_client(mixer.blend(get_user_model()))
+        response = customer.post(reverse('holds-list'), self.hold(10))
+        assert response.status_code == HTTP_201_CREATED
+        assert parse(response)['expires_at'] is not None
+
+        other = get_client(mixer.blend(get_user_model()))
+        assert other.post(reverse('holds-list'), self.hold(10)).status_code == HTTP_400_BAD_REQUEST
+        assert other.post(reverse('reservations-list'), self.hold(10)).status_code == HTTP_400_BAD_REQUEST
+        free = parse(other.get('/api/v1/beachreservation/freeumbrella', {
+            'start_date': datetime.date.today(), 'end_date': datetime.date.today()}))
+        assert 10 not in free and 11 in free
+
+    def test_confirmed_hold_becomes_a_reservation(self, db):
+        user = mixer.blend(get_user_model())
+        client = get_client(user)
+        hold_id = parse(client.post(reverse('holds-list'), self.hold(10)))['id']
+
+        response = client.post(reverse('holds-confirm', kwargs={'pk': hold_id}))
+        assert response.status_code == HTTP_201_CREATED
+        reservation = UmbrellaReservation.objects.get(pk=parse(response)['id'])
+        assert reservation.customer == user and reservation.reserved_umbrella_id == 10
+        assert not UmbrellaHold.objects.exists()
+
+    def test_other_customers_cant_confirm_or_release_a_hold(self, manager):
+        hold_id = parse(get_client(mixer.blend(get_user_model())).post(reverse('holds-list'), self.hold(10)))['id']
+        other = get_client(mixer.blend(get_user_model()))
+        assert other.post(reverse('holds-confirm', kwargs={'pk': hold_id})).status_code == HTTP_404_NOT_FOUND
+        assert other.delete(reverse('holds-detail', kwargs={'pk': hold_id})).status_code == HTTP_404_NOT_FOUND
+
+        assert get_client(manager).post(reverse('holds-confirm', kwargs={'pk': hold_id})).status_code == \
+               HTTP_404_NOT_FOUND
+        assert UmbrellaHold.objects.filter(pk=hold_id).exists()
+
+    def test_released_hold_frees_the_umbrella(self, db):
+        client = get_client(mixer.blend(get_user_model()))
+        hold_id = parse(client.post(reverse('holds-list'), self.hold(10)))['id']
+        assert client.delete(reverse('holds-detail', kwargs={'pk': hold_id})).status_code == HTTP_204_NO_CONTENT
+        assert client.post(reverse('reservations-list'), self.hold(10)).status_code == HTTP_201_CREATED
+
+    def test_expired_hold_cant_be_confirmed(self, db):
+        client = get_client(mixer.blend(get_user_model()))
+        hold_id = parse(client.post(reverse('holds-list'), self.hold(10)))['id']
+        UmbrellaHold.objects.update(expires_at=timezone.now() - relativedelta(seconds=1))
+
+        assert parse(client.get(reverse('holds-list'))) == []
+        assert client.post(reverse('holds-confirm', kwargs={'pk': hold_id})).status_code == HTTP_404_NOT_FOUND
+        call_command('expire_umbrella_holds')
+        assert not UmbrellaHold.objects.exists()
+
+    def test_customers_can_hold_a_limited_number_of_umbrellas(self, db):
+        client = get_client(mixer.blend(get_user_model()))
+        for umbrella_id in range(utils.MAX_ACTIVE_HOLDS_PER_CUSTOMER):
+            assert client.post(reverse('holds-list'), self.hold(10 + umbrella_id)).status_code == HTTP_201_CREATED
+        assert client.post(reverse('holds-list'), self.hold(20)).status_code == HTTP_400_BAD_REQUEST